@@ -7,11 +7,20 @@ from datetime import datetime, timedelta, timezone
 from email.message import EmailMessage
 import hashlib
 import time
-
-from flask import Flask, request, jsonify
-from pymongo import MongoClient, ASCENDING, errors, GEOSPHERE
+import json
+import queue
+import threading
+import math
+import csv
+from collections import deque, Counter as TallyCounter
+from contextlib import contextmanager
+
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+from pymongo import MongoClient, ASCENDING, errors, GEOSPHERE, ReturnDocument, ReplaceOne, UpdateOne, UpdateMany, monitoring
+from pymongo.read_preferences import SecondaryPreferred
 from bson import ObjectId
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 import jwt
 
 # Optional: Google ID token verification
@@ -22,6 +31,15 @@ try:
 except Exception:
     GOOGLE_LIBS_AVAILABLE = False
 
+# Optional: Prometheus metrics (/metrics)
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Histogram
+    from prometheus_client.core import GaugeMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except Exception:
+    PROMETHEUS_AVAILABLE = False
+
 from flask_cors import CORS
 
 
@@ -31,6 +49,8 @@ JWT_SECRET = os.getenv("JWT_SECRET", "change-me-in-prod")
 JWT_EXPIRES_HOURS = int(os.getenv("JWT_EXPIRES_HOURS", "72"))
 RESET_TOKEN_TTL_MINUTES = int(os.getenv("RESET_TOKEN_TTL_MINUTES", "60"))
 MAX_VIDEO_MB = int(os.getenv("MAX_VIDEO_MB", "25"))
+# Request threads per worker process (gunicorn --threads in the Procfile)
+WEB_THREADS = int(os.getenv("WEB_THREADS", "16"))
 
 SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
@@ -41,6 +61,54 @@ APP_URL = os.getenv("APP_URL", "http://localhost:3000")
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 
+# Mongo pool and read routing. Search/availability reads may go to secondaries
+# (bounded by max staleness, min 90s); booking checks and all writes use the primary.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0")) or None
+MONGO_SECONDARY_READS = os.getenv("MONGO_SECONDARY_READS", "true").lower() in ("1", "true", "yes")
+MONGO_MAX_STALENESS_SECONDS = max(90, int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "120")))
+
+# Admission control for the expensive auth endpoints (see RATE_LIMIT_POLICIES).
+# RATE_LIMIT_BACKEND: memory (per process) | mongo (shared across processes)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+CONCURRENCY_PASSWORD_HASH = int(os.getenv("CONCURRENCY_PASSWORD_HASH", "4"))
+CONCURRENCY_EMAIL = int(os.getenv("CONCURRENCY_EMAIL", "4"))
+CONCURRENCY_OAUTH = int(os.getenv("CONCURRENCY_OAUTH", "8"))
+# Number of reverse proxies in front of the app (Heroku/Render: 1); used for client IPs
+PROXY_FIX_X_FOR = int(os.getenv("PROXY_FIX_X_FOR", "0"))
+
+# Opt-in per-request query tracing: Server-Timing header, slow-request log,
+# repeated same-shape query (N+1) detection
+QUERY_TRACE_ENABLED = os.getenv("QUERY_TRACE_ENABLED", "false").lower() in ("1", "true", "yes")
+QUERY_TRACE_SLOW_MS = float(os.getenv("QUERY_TRACE_SLOW_MS", "500"))
+QUERY_TRACE_REPEAT_THRESHOLD = int(os.getenv("QUERY_TRACE_REPEAT_THRESHOLD", "3"))
+
+METRICS_ENABLED = PROMETHEUS_AVAILABLE and os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Multi-day bookings: most dates accepted by one POST /bookings
+MAX_BOOKING_DAYS = int(os.getenv("MAX_BOOKING_DAYS", "31"))
+
+# Idempotency-Key support for POST /bookings and POST /venues/register
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+# Bulk venue import (POST /venues/import)
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "10000"))
+BULK_IMPORT_MAX_ERRORS = 1000  # per-row errors reported; further failures are only counted
+
+# Live events (SSE). EVENTS_SOURCE: auto | change_stream | local
+EVENTS_SOURCE = os.getenv("EVENTS_SOURCE", "auto")
+# Per process. An open stream holds a request thread for up to
+# SSE_MAX_STREAM_SECONDS, so streams may take at most half of WEB_THREADS
+SSE_MAX_CONNECTIONS = min(int(os.getenv("SSE_MAX_CONNECTIONS", str(WEB_THREADS // 4))), WEB_THREADS // 2)
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_STREAM_SECONDS = int(os.getenv("SSE_MAX_STREAM_SECONDS", "300"))
+# Lifetime of the stream-scoped token /events/me takes in its query string
+SSE_TOKEN_TTL_SECONDS = int(os.getenv("SSE_TOKEN_TTL_SECONDS", "60"))
+
 
 
 # Cloudinary (optional, signature only)
@@ -50,15 +118,208 @@ CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 CLOUDINARY_UPLOAD_PRESET = os.getenv("CLOUDINARY_UPLOAD_PRESET")
 
 app = Flask(__name__)
-CORS(app, origins=["http://localhost:5173", "https://your-frontend-domain.com"])
+if PROXY_FIX_X_FOR:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_FIX_X_FOR)
+elif RATE_LIMIT_ENABLED and any(os.getenv(v) for v in ("DYNO", "RENDER", "RAILWAY_ENVIRONMENT")):
+    # Behind the platform router every request comes from the router's address,
+    # so per-IP rate limits would become one limit shared by all clients
+    print("[RATE_LIMIT] WARNING: running behind a platform proxy with PROXY_FIX_X_FOR=0; "
+          "per-IP limits are shared by all clients. Set PROXY_FIX_X_FOR=1.")
+CORS_ORIGINS = ["http://localhost:5173", "https://your-frontend-domain.com"]
+CORS(app, origins=CORS_ORIGINS)
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks open/in-use/waiting connections per server for /ready, for one client."""
+
+    def __init__(self, client_name="sync"):
+        self.client_name = client_name
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _pool(self, address):
+        return self._pools.setdefault(address, {"open": 0, "in_use": 0, "waiting": 0, "wait_timeouts": 0})
+
+    def _add(self, address, **deltas):
+        with self._lock:
+            p = self._pool(address)
+            for k, d in deltas.items():
+                p[k] += d
+
+    def pool_created(self, event): self._add(event.address)
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(event.address, None)
+    def connection_created(self, event): self._add(event.address, open=1)
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): self._add(event.address, open=-1)
+    def connection_check_out_started(self, event): self._add(event.address, waiting=1)
+    def connection_check_out_failed(self, event):
+        timeout = event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT
+        self._add(event.address, waiting=-1, wait_timeouts=int(timeout))
+    def connection_checked_out(self, event): self._add(event.address, waiting=-1, in_use=1)
+    def connection_checked_in(self, event): self._add(event.address, in_use=-1)
+
+    def stats(self, max_pool_size):
+        with self._lock:
+            return [{
+                "address": f"{host}:{port}",
+                "client": self.client_name,
+                **p,
+                "max_pool_size": max_pool_size,
+                "utilization": round(p["in_use"] / max_pool_size, 4) if max_pool_size else None,
+            } for (host, port), p in self._pools.items()]
+
+
+# Per-thread request context for Mongo command accounting. pymongo publishes
+# command events on the thread that issued the command, so each request
+# thread only sees its own commands.
+request_local = threading.local()
+
+if METRICS_ENABLED:
+    HTTP_REQUESTS = Counter("halls_http_requests_total", "HTTP requests", ["route", "method", "status"])
+    HTTP_ERRORS = Counter("halls_http_request_errors_total", "HTTP responses with ok=false (status >= 400)", ["route", "method", "status"])
+    HTTP_LATENCY = Histogram("halls_http_request_duration_seconds", "Handler latency (time to first byte for streams)", ["route", "method"],
+                             buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+    HTTP_MONGO_COMMANDS = Histogram("halls_http_request_mongo_commands", "Mongo commands issued per request", ["route"],
+                                    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50))
+    MONGO_LATENCY = Histogram("halls_mongo_command_duration_seconds", "Mongo command latency", ["collection", "command"],
+                              buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5))
+    MONGO_FAILURES = Counter("halls_mongo_command_failures_total", "Failed Mongo commands", ["collection", "command"])
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Mongo command latency per collection/command, and per-request command counts."""
+
+    def __init__(self):
+        self._inflight = {}  # request_id -> collection (only 'started' carries the command body)
+
+    def started(self, event):
+        coll = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            coll = event.command.get("collection")
+        self._inflight[event.request_id] = coll if isinstance(coll, str) else "-"
+        if getattr(request_local, "mongo_commands", None) is not None:
+            request_local.mongo_commands += 1
+
+    def succeeded(self, event):
+        coll = self._inflight.pop(event.request_id, "-")
+        MONGO_LATENCY.labels(coll, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        coll = self._inflight.pop(event.request_id, "-")
+        MONGO_LATENCY.labels(coll, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_FAILURES.labels(coll, event.command_name).inc()
+
+
+def query_shape(value):
+    """Filter with values replaced by '?', so queries differing only in values compare equal."""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(value[0])] if value else []
+    return "?"
+
+
+def command_filter(cmd, name):
+    if name in ("find", "count", "distinct"):
+        return cmd.get("filter", cmd.get("query"))
+    if name == "findAndModify":
+        return cmd.get("query")
+    if name in ("update", "delete"):
+        ops = cmd.get("updates" if name == "update" else "deletes") or []
+        return ops[0].get("q") if ops else None
+    if name == "aggregate":
+        first = (cmd.get("pipeline") or [{}])[0]
+        return first.get("$match")
+    return None
 
-client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+
+def reply_docs(reply, name):
+    if name in ("find", "aggregate"):
+        return len((reply.get("cursor") or {}).get("firstBatch", []))
+    if name == "getMore":
+        return len((reply.get("cursor") or {}).get("nextBatch", []))
+    if name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    return reply.get("n")
+
+
+class QueryTracer(monitoring.CommandListener):
+    """Records every Mongo command issued by a traced request (see request_local.trace)."""
+
+    def started(self, event):
+        trace = getattr(request_local, "trace", None)
+        if trace is None:
+            return
+        coll = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            coll = event.command.get("collection")
+        flt = command_filter(event.command, event.command_name)
+        trace["pending"][event.request_id] = {
+            "collection": coll if isinstance(coll, str) else "-",
+            "command": event.command_name,
+            "shape": json.dumps(query_shape(flt), sort_keys=True) if flt is not None else None,
+        }
+
+    def succeeded(self, event):
+        self._finish(event, docs=lambda: reply_docs(event.reply, event.command_name))
+
+    def failed(self, event):
+        self._finish(event, docs=lambda: None, failed=True)
+
+    def _finish(self, event, docs, failed=False):
+        trace = getattr(request_local, "trace", None)
+        if trace is None:
+            return
+        call = trace["pending"].pop(event.request_id, None)
+        if call is None:
+            return
+        call["ms"] = event.duration_micros / 1000
+        call["docs"] = docs()
+        if failed:
+            call["failed"] = True
+        trace["calls"].append(call)
+
+
+pool_monitor = PoolMonitor()
+pool_monitors = [pool_monitor]  # one per client; asgi.py adds its async client's
+
+
+def pool_stats():
+    return [p for m in pool_monitors for p in m.stats(MONGO_MAX_POOL_SIZE)]
+
+
+listeners = [pool_monitor]
+if METRICS_ENABLED:
+    listeners.append(CommandMetrics())
+if QUERY_TRACE_ENABLED:
+    listeners.append(QueryTracer())
+client = MongoClient(
+    MONGO_URI,
+    serverSelectionTimeoutMS=5000,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    event_listeners=listeners,
+)
 db = client["halls_db"]
 users = db["users"]
 venues = db["venues"]
 password_resets = db["password_resets"]
 bookings = db["bookings"]
 
+# Read-only handles for search/availability; fall back to the primary when no
+# secondary is fresh enough (or on a standalone server)
+if MONGO_SECONDARY_READS:
+    _secondary_reads = SecondaryPreferred(max_staleness=MONGO_MAX_STALENESS_SECONDS)
+    venues_read = venues.with_options(read_preference=_secondary_reads)
+    bookings_read = bookings.with_options(read_preference=_secondary_reads)
+else:
+    venues_read, bookings_read = venues, bookings
+booking_rollups = db["booking_rollups"]  # per venue per month, see record_booking_transition
+idempotency_keys = db["idempotency_keys"]  # stored first responses, see idempotent()
+
 #--------------------------------------------------
 
 # After: db = client[...] and collections like `users`, `venues`
@@ -93,6 +354,14 @@ except errors.PyMongoError:
 
 
 # -------------------- Indexes --------------------
+def ensure_index(coll, keys, **kwargs):
+    """create_index that logs instead of raising, so one failure can't skip the others."""
+    try:
+        coll.create_index(keys, **kwargs)
+    except errors.PyMongoError as e:
+        print(f"[INDEX] {coll.name}.{kwargs.get('name')} not created: {e}")
+
+
 try:
     users.create_index([("email", ASCENDING)], unique=True, name="uniq_email")
     venues.create_index([("owner_id", ASCENDING)], name="idx_owner")
@@ -100,10 +369,46 @@ try:
     venues.create_index([("capacity", ASCENDING)], name="idx_capacity")
     venues.create_index([("maps_location", GEOSPHERE)], name="idx_geo")
     venues.create_index([("pricing.overrides.date", ASCENDING)], name="idx_price_date")
-    bookings.create_index([("venue_id", ASCENDING), ("date", ASCENDING), ("status", ASCENDING)], name="idx_booking_v_d_s")
+    # Search: equality on type/date/amenity_mask ($in point bounds), range on capacity last
+    venues.create_index([("type", ASCENDING), ("dates_available", ASCENDING), ("amenity_mask", ASCENDING), ("capacity", ASCENDING)],
+                        name="idx_search_type_date_amenity_cap")
+    venues.create_index([("type", ASCENDING), ("amenity_mask", ASCENDING), ("capacity", ASCENDING)],
+                        name="idx_search_type_amenity_cap")
+    # Same without the type prefix: the search form sends no type by default
+    venues.create_index([("dates_available", ASCENDING), ("amenity_mask", ASCENDING), ("capacity", ASCENDING)],
+                        name="idx_search_date_amenity_cap")
+    venues.create_index([("amenity_mask", ASCENDING), ("capacity", ASCENDING)],
+                        name="idx_search_amenity_cap")
     bookings.create_index([("user_id", ASCENDING), ("created_at", ASCENDING)], name="idx_booking_user_time")
-except errors.PyMongoError:
-    pass
+except errors.PyMongoError as e:
+    print(f"[INDEX] index setup stopped early: {e}")
+
+# Reset tokens: lookup by hash, per-user cleanup, and Mongo-side expiry (TTL)
+ensure_index(password_resets, [("token_hash", ASCENDING)], unique=True, sparse=True, name="uniq_reset_token_hash")
+ensure_index(password_resets, [("user_id", ASCENDING)], name="idx_reset_user")
+ensure_index(password_resets, [("expires_at", ASCENDING)], expireAfterSeconds=0, name="ttl_reset_expires")
+
+# Rollups: one document per venue and month (concurrent first upserts retry on
+# the duplicate key), read per owner by /analytics/owner
+ensure_index(booking_rollups, [("venue_id", ASCENDING), ("month", ASCENDING)], unique=True, name="uniq_rollup_venue_month")
+ensure_index(booking_rollups, [("owner_id", ASCENDING), ("month", ASCENDING)], name="idx_rollup_owner_month")
+
+if RATE_LIMIT_BACKEND == "mongo":
+    ensure_index(db["rate_limits"], [("expires_at", ASCENDING)], expireAfterSeconds=0, name="ttl_rate_limit")
+
+# Idempotency records (including abandoned 'processing' ones) expire server-side
+ensure_index(idempotency_keys, [("expires_at", ASCENDING)], expireAfterSeconds=0, name="ttl_idempotency")
+
+# At most one pending/confirmed booking per venue and date, enforced by the server
+# so two concurrent create_booking calls can't both pass the availability check.
+# Separate block: it needs MongoDB 6.0+ ($in in a partial filter) and fails while
+# duplicates exist, neither of which should skip the indexes above.
+try:
+    bookings.create_index([("venue_id", ASCENDING), ("date", ASCENDING)], unique=True,
+                          partialFilterExpression={"status": {"$in": ["pending", "confirmed"]}},
+                          name="uniq_booking_active_v_d")
+except errors.PyMongoError as e:
+    print(f"[INDEX] uniq_booking_active_v_d not created; double bookings are only checked by the app: {e}")
 
 
 # -------------------- Helpers --------------------
@@ -127,23 +432,55 @@ def issue_token(user):
     return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
 
 
-def auth_required(owner_only=False):
+def issue_scoped_token(user, scope, ttl_seconds):
+    # Short-lived token usable only where 'scope' is expected (never as a bearer token)
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": str(user["_id"]),
+        "scope": scope,
+        "iat": int(now.timestamp()),
+        "exp": int((now + timedelta(seconds=ttl_seconds)).timestamp()),
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+
+def token_subject(auth, scope=None):
+    """
+    Decode a "Bearer <jwt>" header value -> (user ObjectId, None) or (None, error message).
+    The token's 'scope' claim must equal scope: login tokens have none.
+    """
+    if not auth.startswith("Bearer "):
+        return None, "Missing or invalid Authorization header."
+    token = auth.split(" ", 1)[1].strip()
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        return None, "Token expired."
+    except Exception:
+        return None, "Invalid token."
+    if payload.get("scope") != scope:
+        return None, "Invalid token scope."
+    user_id = payload.get("sub")
+    if not user_id or not ObjectId.is_valid(user_id):
+        return None, "Invalid token subject."
+    return ObjectId(user_id), None
+
+
+def auth_required(owner_only=False, query_token_scope=None):
+    # query_token_scope: also accept ?access_token=... for clients that can't set
+    # headers (browser EventSource), but only a short-lived token of that scope:
+    # query strings end up in access logs
     def decorator(fn):
         def wrapper(*args, **kwargs):
             auth = request.headers.get("Authorization", "")
-            if not auth.startswith("Bearer "):
-                return err("Missing or invalid Authorization header.", 401)
-            token = auth.split(" ", 1)[1].strip()
-            try:
-                payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-            except jwt.ExpiredSignatureError:
-                return err("Token expired.", 401)
-            except Exception:
-                return err("Invalid token.", 401)
-            user_id = payload.get("sub")
-            if not user_id:
-                return err("Invalid token subject.", 401)
-            user = users.find_one({"_id": ObjectId(user_id)})
+            scope = None
+            if not auth.startswith("Bearer ") and query_token_scope and request.args.get("access_token"):
+                auth, scope = "Bearer " + request.args["access_token"], query_token_scope
+            with trace_span("jwt"):
+                user_id, msg = token_subject(auth, scope)
+            if msg:
+                return err(msg, 401)
+            user = users.find_one({"_id": user_id})
             if not user:
                 return err("User not found.", 401)
             if owner_only and not bool(user.get("is_venue_owner", False)):
@@ -177,6 +514,11 @@ def send_email(to_email: str, subject: str, html_body: str, text_body: str = Non
     return True
 
 
+def hash_reset_token(token: str) -> str:
+    # Only the hash is stored, so a leaked password_resets collection can't be replayed
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
 def user_profile_doc(user):
     return {
         "id": str(user["_id"]),
@@ -189,14 +531,410 @@ def user_profile_doc(user):
     }
 
 
+# -------------------- Admission control --------------------
+# (rate per second, burst) token buckets per client IP and per account (email),
+# plus the concurrency class the endpoint is admitted under.
+RATE_LIMIT_POLICIES = {
+    "login": {"ip": (10 / 60, 10), "account": (5 / 60, 5), "concurrency": "password_hash"},
+    "signup": {"ip": (5 / 60, 5), "account": (3 / 60, 3), "concurrency": "password_hash"},
+    "forgot_password": {"ip": (5 / 60, 5), "account": (3 / 3600, 3), "concurrency": "email"},
+    "google_login": {"ip": (10 / 60, 10), "concurrency": "oauth"},
+}
+
+
+class MemoryRateLimitStore:
+    """Token buckets in process memory. Each worker process limits on its own."""
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> [tokens, last_refill]
+        self._calls = 0
+
+    def take(self, key, rate, burst):
+        """Take one token. Returns (allowed, retry_after_seconds)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - ts) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = [tokens, now]
+            self._calls += 1
+            if self._calls % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def _sweep(self, now):
+        # Every policy refills within an hour, so older buckets equal new ones
+        stale = [k for k, (tokens, ts) in self._buckets.items() if now - ts > 3600]
+        for k in stale:
+            del self._buckets[k]
+
+
+class MongoRateLimitStore:
+    """
+    Token buckets shared by every worker, one atomic pipeline update per take.
+    Idle buckets are removed by a TTL index on expires_at. If Mongo errors,
+    requests are let through rather than failing the endpoint.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def take(self, key, rate, burst):
+        now = time.time()
+        idle_ttl = timedelta(seconds=max(60, burst / rate))
+        try:
+            doc = self.collection.find_one_and_update({"_id": key}, [
+                {"$set": {"tokens": {"$min": [burst, {"$add": [
+                    {"$ifNull": ["$tokens", burst]},
+                    {"$multiply": [{"$subtract": [now, {"$ifNull": ["$ts", now]}]}, rate]},
+                ]}]}}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}, "ts": now,
+                          "expires_at": datetime.utcnow() + idle_ttl}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+            ], upsert=True, return_document=ReturnDocument.AFTER)
+        except errors.PyMongoError as e:
+            print(f"[RATE-LIMIT] store unavailable, allowing request: {e}")
+            return True, 0
+        if doc["allowed"]:
+            return True, 0
+        return False, (1 - doc["tokens"]) / rate
+
+
+# Replaceable (e.g. by a stand-in in tests); anything with take(key, rate, burst)
+rate_limit_store = MongoRateLimitStore(db["rate_limits"]) if RATE_LIMIT_BACKEND == "mongo" else MemoryRateLimitStore()
+
+# In-flight caps per endpoint class; excess is shed immediately instead of
+# queueing behind CPU-heavy hashing or slow SMTP/Google calls
+concurrency_caps = {
+    "password_hash": CONCURRENCY_PASSWORD_HASH,
+    "email": CONCURRENCY_EMAIL,
+    "oauth": CONCURRENCY_OAUTH,
+}
+concurrency_limits = {cls: threading.BoundedSemaphore(n) for cls, n in concurrency_caps.items()}
+
+
+def with_retry_after(response, seconds):
+    resp, status = response
+    resp.headers["Retry-After"] = str(max(1, math.ceil(seconds)))
+    return resp, status
+
+
+_warned_forwarded_for = False
+
+
+def warn_unproxied_forwarded_for():
+    # X-Forwarded-For without ProxyFix: remote_addr is the proxy, not the client
+    global _warned_forwarded_for
+    if not PROXY_FIX_X_FOR and not _warned_forwarded_for and request.headers.get("X-Forwarded-For"):
+        _warned_forwarded_for = True
+        print(f"[RATE_LIMIT] WARNING: X-Forwarded-For received with PROXY_FIX_X_FOR=0; per-IP limits "
+              f"key on the proxy address {request.remote_addr}. Set PROXY_FIX_X_FOR to the number of proxies.")
+
+
+def rate_limited(policy_name):
+    """
+    Admission control for an endpoint: per-IP and per-account token buckets
+    (429 when empty), then a per-class concurrency slot (503 when full).
+    Both responses carry Retry-After.
+    """
+    policy = RATE_LIMIT_POLICIES[policy_name]
+
+    def decorator(fn):
+        def wrapper(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return fn(*args, **kwargs)
+
+            warn_unproxied_forwarded_for()
+            keys = [("ip", f"{policy_name}:ip:{request.remote_addr}")]
+            if "account" in policy:
+                email = ((request.get_json(silent=True) or {}).get("email") or "")
+                if isinstance(email, str) and email.strip():
+                    keys.append(("account", f"{policy_name}:acct:{email.strip().lower()}"))
+            for kind, key in keys:
+                allowed, retry_after = rate_limit_store.take(key, *policy[kind])
+                if not allowed:
+                    return with_retry_after(err("Too many requests. Please retry later.", 429), retry_after)
+
+            sem = concurrency_limits[policy["concurrency"]]
+            if not sem.acquire(blocking=False):
+                return with_retry_after(err("Server busy. Please retry shortly.", 503), 1)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                sem.release()
+        wrapper.__name__ = fn.__name__
+        return wrapper
+    return decorator
+
+
+# -------------------- Idempotency keys --------------------
+def idempotent(scope):
+    """
+    Honour an Idempotency-Key header: the first response (status < 500) is
+    stored for IDEMPOTENCY_TTL_HOURS and replayed on retries with the same key
+    after a single _id lookup, without re-running the handler. Keys are scoped
+    per user and endpoint; reusing one with a different body is rejected.
+    Must sit below auth_required.
+    """
+    def decorator(fn):
+        def wrapper(*args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+            if key is None:
+                return fn(*args, **kwargs)
+            key = key.strip()
+            if not key or len(key) > 255:
+                return err("Idempotency-Key must be 1-255 characters.", 422)
+
+            rec_id = f"{request.user['_id']}:{scope}:{key}"
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+            now = datetime.utcnow()
+
+            rec = idempotency_keys.find_one({"_id": rec_id})
+            if rec is None:
+                try:
+                    idempotency_keys.insert_one({
+                        "_id": rec_id,
+                        "state": "processing",
+                        "fingerprint": fingerprint,
+                        "locked_until": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                        "expires_at": now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+                    })
+                except errors.DuplicateKeyError:
+                    rec = idempotency_keys.find_one({"_id": rec_id})  # concurrent retry got there first
+
+            if rec is not None:
+                if rec.get("fingerprint") != fingerprint:
+                    return err("Idempotency-Key was already used with a different request body.", 422)
+                if rec.get("state") == "done":
+                    resp = Response(rec["body"], status=rec["status"], mimetype=rec.get("mimetype", "application/json"))
+                    resp.headers["Idempotent-Replayed"] = "true"
+                    return resp
+                # Still processing: wait, unless the original worker died holding the lock
+                taken = idempotency_keys.find_one_and_update(
+                    {"_id": rec_id, "state": "processing", "locked_until": {"$lt": now}},
+                    {"$set": {"locked_until": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}}
+                )
+                if taken is None:
+                    return with_retry_after(err("A request with this Idempotency-Key is still in progress.", 409), 1)
+
+            try:
+                resp = app.make_response(fn(*args, **kwargs))
+            except Exception:
+                idempotency_keys.delete_one({"_id": rec_id, "state": "processing"})
+                raise
+            if resp.status_code >= 500:
+                idempotency_keys.delete_one({"_id": rec_id, "state": "processing"})  # let the client retry
+            else:
+                idempotency_keys.update_one({"_id": rec_id}, {"$set": {
+                    "state": "done",
+                    "status": resp.status_code,
+                    "body": resp.get_data(as_text=True),
+                    "mimetype": resp.mimetype,
+                }, "$unset": {"locked_until": ""}})
+            return resp
+        wrapper.__name__ = fn.__name__
+        return wrapper
+    return decorator
+
+
+# -------------------- Tracing (opt-in) --------------------
+@contextmanager
+def trace_span(name):
+    """Time a non-Mongo step of a traced request (reported in Server-Timing)."""
+    trace = getattr(request_local, "trace", None)
+    if trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace["spans"].append((name, (time.perf_counter() - t0) * 1000))
+
+
+def repeated_queries(calls, threshold):
+    """Same collection/command/filter shape issued `threshold`+ times: likely an N+1 loop."""
+    tally = TallyCounter((c["collection"], c["command"], c["shape"]) for c in calls if c["shape"] is not None)
+    return [{"collection": k[0], "command": k[1], "shape": k[2], "count": n}
+            for k, n in tally.items() if n >= threshold]
+
+
+def server_timing(trace, total_ms):
+    parts = [f"{name};dur={ms:.2f}" for name, ms in trace["spans"]]
+    per_op = {}
+    for c in trace["calls"]:
+        key = f"db.{c['collection']}.{c['command']}"
+        n, ms = per_op.get(key, (0, 0.0))
+        per_op[key] = (n + 1, ms + c["ms"])
+    for key, (n, ms) in per_op.items():
+        parts.append(f'{key};dur={ms:.2f};desc="x{n}"')
+    db_ms = sum(c["ms"] for c in trace["calls"])
+    parts.append(f'db;dur={db_ms:.2f};desc="{len(trace["calls"])} queries"')
+    parts.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(parts)
+
+
+@app.before_request
+def trace_start():
+    if QUERY_TRACE_ENABLED:
+        request_local.trace = {"spans": [], "calls": [], "pending": {}, "t0": time.perf_counter()}
+
+
+@app.after_request
+def trace_finish(response):
+    trace = getattr(request_local, "trace", None)
+    if trace is None:
+        return response
+    request_local.trace = None
+    total_ms = (time.perf_counter() - trace["t0"]) * 1000
+    response.headers["Server-Timing"] = server_timing(trace, total_ms)
+
+    repeats = repeated_queries(trace["calls"], QUERY_TRACE_REPEAT_THRESHOLD)
+    if repeats:
+        response.headers["X-Query-Repeats"] = ", ".join(f"{r['collection']}.{r['command']} x{r['count']}" for r in repeats)
+        for r in repeats:
+            print(f"[TRACE] repeated query {request.method} {request.path}: "
+                  f"{r['collection']}.{r['command']} x{r['count']} shape={r['shape']}")
+    if total_ms >= QUERY_TRACE_SLOW_MS:
+        print(f"[TRACE] slow request {request.method} {request.path} -> {response.status_code} "
+              f"{total_ms:.1f}ms; spans={[(n, round(ms, 2)) for n, ms in trace['spans']]}")
+        for c in trace["calls"]:
+            print(f"[TRACE]   {c['collection']}.{c['command']} {c['ms']:.2f}ms docs={c['docs']} "
+                  f"shape={c['shape']}{' FAILED' if c.get('failed') else ''}")
+    return response
+
+
+@app.teardown_request
+def trace_teardown(exc):
+    request_local.trace = None
+
+
+# -------------------- Metrics (Prometheus) --------------------
+def metrics_route():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"  # bounded label set
+
+
+@app.before_request
+def metrics_start():
+    g.request_started = time.perf_counter()
+    request_local.mongo_commands = 0
+
+
+@app.after_request
+def metrics_observe(response):
+    if METRICS_ENABLED and "request_started" in g:
+        g.metrics_observed = True
+        route, method, status = metrics_route(), request.method, str(response.status_code)
+        HTTP_LATENCY.labels(route, method).observe(time.perf_counter() - g.request_started)
+        HTTP_REQUESTS.labels(route, method, status).inc()
+        if response.status_code >= 400:
+            HTTP_ERRORS.labels(route, method, status).inc()
+        HTTP_MONGO_COMMANDS.labels(route).observe(request_local.mongo_commands)
+    return response
+
+
+@app.teardown_request
+def metrics_teardown(exc):
+    if METRICS_ENABLED and exc is not None and "request_started" in g and "metrics_observed" not in g:
+        # Unhandled exception that skipped after_request (PROPAGATE_EXCEPTIONS, or
+        # an after_request hook raised); normally the 500 response went through it
+        route, method = metrics_route(), request.method
+        HTTP_LATENCY.labels(route, method).observe(time.perf_counter() - g.request_started)
+        HTTP_REQUESTS.labels(route, method, "500").inc()
+        HTTP_ERRORS.labels(route, method, "500").inc()
+    request_local.mongo_commands = None
+
+
+class AppStateCollector:
+    """Gauges read at scrape time: SSE hub, Mongo pools, admission control."""
+
+    def describe(self):
+        return []  # keeps register() from calling collect() before the app is set up
+
+    def collect(self):
+        ev = event_hub.stats()
+        yield GaugeMetricFamily("halls_sse_connections", "Open SSE streams", value=ev["connections"])
+        yield GaugeMetricFamily("halls_sse_topics", "SSE topics with subscribers", value=ev["topics"])
+        fanout = GaugeMetricFamily("halls_sse_fanout_seconds", "Recent SSE fan-out latency", labels=["quantile"])
+        for q in ("p50", "p95", "p99"):
+            if ev["fanout_ms"][q] is not None:
+                fanout.add_metric([q], ev["fanout_ms"][q] / 1000)
+        yield fanout
+
+        pools = pool_stats()
+        for name, key, doc in [("halls_mongo_pool_open", "open", "Open pooled connections"),
+                               ("halls_mongo_pool_in_use", "in_use", "Checked-out connections"),
+                               ("halls_mongo_pool_waiting", "waiting", "Requests waiting for a connection")]:
+            fam = GaugeMetricFamily(name, doc, labels=["address", "client"])
+            for p in pools:
+                fam.add_metric([p["address"], p["client"]], p[key])
+            yield fam
+
+        inflight = GaugeMetricFamily("halls_admission_inflight", "In-flight requests per concurrency class", labels=["class"])
+        for cls, sem in concurrency_limits.items():
+            inflight.add_metric([cls], concurrency_caps[cls] - sem._value)  # no public counter on semaphores
+        yield inflight
+        if isinstance(rate_limit_store, MemoryRateLimitStore):
+            yield GaugeMetricFamily("halls_rate_limit_buckets", "Token buckets held in memory", value=len(rate_limit_store._buckets))
+
+
+if METRICS_ENABLED:
+    prometheus_client.REGISTRY.register(AppStateCollector())
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus text exposition. Each worker process keeps its own series; with
+    several gunicorn workers set PROMETHEUS_MULTIPROC_DIR so counters and
+    histograms are aggregated (state gauges then describe the scraped worker).
+    """
+    if not METRICS_ENABLED:
+        return err("Metrics disabled or prometheus_client not installed.", 404)
+    registry = prometheus_client.REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(AppStateCollector())
+    return Response(prometheus_client.generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+
 # -------------------- Health --------------------
 @app.get("/health")
 def health():
-    return ok({"status": "up"})
+    return ok({"status": "up", "events": event_hub.stats()})
+
+
+@app.get("/ready")
+def ready():
+    """Readiness: the primary answers a ping; reports pool utilization and wait-queue depth."""
+    data = {
+        "status": "ready",
+        "mongo": {
+            "secondary_reads": MONGO_SECONDARY_READS,
+            "max_staleness_seconds": MONGO_MAX_STALENESS_SECONDS if MONGO_SECONDARY_READS else None,
+            "pools": pool_stats(),
+        },
+    }
+    try:
+        client.admin.command("ping")
+    except errors.PyMongoError as e:
+        data["status"] = "unavailable"
+        data["mongo"]["error"] = str(e)
+        return jsonify({"ok": False, "error": "MongoDB unavailable.", "data": data}), 503
+    return ok(data)
 
 
 # -------------------- Auth: Signup/Login/Google --------------------
 @app.post("/auth/signup")
+@rate_limited("signup")
 def signup():
     body = request.get_json(silent=True) or {}
     email = (body.get("email") or "").strip().lower()
@@ -224,16 +962,16 @@ def signup():
         "auth_provider": "password"
     }
     try:
-        users.insert_one(doc)
+        users.insert_one(doc)  # sets doc["_id"]; no need to read the user back
     except errors.DuplicateKeyError:
         return err("Email already registered.", 409)
 
-    user = users.find_one({"email": email})
-    token = issue_token(user)
-    return ok({"token": token, "profile": user_profile_doc(user)}, status=201)
+    token = issue_token(doc)
+    return ok({"token": token, "profile": user_profile_doc(doc)}, status=201)
 
 
 @app.post("/auth/login")
+@rate_limited("login")
 def login():
     body = request.get_json(silent=True) or {}
     email = (body.get("email") or "").strip().lower()
@@ -251,6 +989,7 @@ def login():
 
 
 @app.post("/auth/google")
+@rate_limited("google_login")
 def google_login():
     if not GOOGLE_LIBS_AVAILABLE:
         return err("Google auth libraries not installed. Add 'google-auth'.", 500)
@@ -278,29 +1017,33 @@ def google_login():
     contact_number = (body.get("contact_number") or "").strip()
     is_venue_owner = bool(body.get("is_venue_owner", False))
 
-    user = users.find_one({"email": email})
-    if not user:
-        doc = {
-            "full_name": full_name,
-            "email": email,
-            "password_hash": None,
-            "contact_number": contact_number,
-            "is_venue_owner": is_venue_owner,
-            "role": "owner" if is_venue_owner else "user",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow(),
-            "auth_provider": "google"
-        }
-        try:
-            users.insert_one(doc)
-        except errors.DuplicateKeyError:
-            user = users.find_one({"email": email})
-        else:
-            user = users.find_one({"email": email})
+    # Create-or-fetch (and owner upgrade) in a single upsert round trip
+    on_insert = {
+        "full_name": full_name,
+        "email": email,
+        "password_hash": None,
+        "contact_number": contact_number,
+        "is_venue_owner": False,
+        "role": "user",
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+        "auth_provider": "google"
+    }
+    update = {"$setOnInsert": on_insert}
+    if is_venue_owner:
+        for k in ("is_venue_owner", "role"):
+            on_insert.pop(k)
+        update["$set"] = {"is_venue_owner": True, "role": "owner"}
 
-    if is_venue_owner and not bool(user.get("is_venue_owner", False)):
-        users.update_one({"_id": user["_id"]}, {"$set": {"is_venue_owner": True, "role": "owner"}})
-        user = users.find_one({"_id": user["_id"]})
+    try:
+        user = users.find_one_and_update(
+            {"email": email}, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except errors.DuplicateKeyError:
+        # Lost an upsert race with a concurrent first login; the user exists now
+        user = users.find_one_and_update(
+            {"email": email}, update, return_document=ReturnDocument.AFTER
+        )
 
     token = issue_token(user)
     return ok({"token": token, "profile": user_profile_doc(user)})
@@ -315,6 +1058,7 @@ def me():
 
 # -------------------- Forgot / Reset Password --------------------
 @app.post("/auth/forgot-password")
+@rate_limited("forgot_password")
 def forgot_password():
     body = request.get_json(silent=True) or {}
     email = (body.get("email") or "").strip().lower()
@@ -325,9 +1069,11 @@ def forgot_password():
     if user:
         token = secrets.token_urlsafe(32)
         expires_at = datetime.utcnow() + timedelta(minutes=RESET_TOKEN_TTL_MINUTES)
+        # A new link supersedes any outstanding ones for this user
+        password_resets.delete_many({"user_id": user["_id"]})
         password_resets.insert_one({
             "user_id": user["_id"],
-            "token": token,
+            "token_hash": hash_reset_token(token),
             "expires_at": expires_at,
             "created_at": datetime.utcnow()
         })
@@ -349,9 +1095,11 @@ def reset_password():
     if not token or not new_password or len(new_password) < 6:
         return err("Token and a new password (min 6 chars) are required.", 422)
 
-    rec = password_resets.find_one({"token": token})
+    # Indexed lookup that also consumes the token, so it can't be used twice
+    rec = password_resets.find_one_and_delete({"token_hash": hash_reset_token(str(token))})
     if not rec:
         return err("Invalid or expired token.", 400)
+    # The TTL monitor only runs about once a minute, so still check expiry here
     if rec["expires_at"] < datetime.utcnow():
         return err("Token expired.", 400)
 
@@ -359,7 +1107,6 @@ def reset_password():
     users.update_one({"_id": user_id}, {
         "$set": {"password_hash": generate_password_hash(new_password), "updated_at": datetime.utcnow()}
     })
-    password_resets.delete_one({"_id": rec["_id"]})
     return ok({"message": "Password reset successful."})
 
 
@@ -477,58 +1224,77 @@ def sign_cloudinary():
 
 
 
-@app.post("/venues/register")
-@auth_required(owner_only=True)
-def register_venue():
-    b = request.get_json(silent=True) or {}
+# Amenity i is bit (1 << i) of venue.amenity_mask, an indexed scalar that
+# search can match with point bounds (see masks_with_all)
+AMENITY_KEYS = ["parking_valet", "entry_package", "water", "air_conditioner", "partition_facility", "sound_system"]
+
+# Aggregation expression recomputing amenity_mask from the amenities subdocument
+AMENITY_MASK_EXPR = {"$add": [{"$cond": [f"$amenities.{k}", 1 << i, 0]} for i, k in enumerate(AMENITY_KEYS)]}
+
+
+def amenity_mask(amenities):
+    return sum(1 << i for i, k in enumerate(AMENITY_KEYS) if amenities.get(k))
+
+
+def masks_with_all(keys):
+    """Every mask value that has all of `keys` set (2^(6-len(keys)) values)."""
+    required = amenity_mask({k: True for k in keys})
+    return [m for m in range(1 << len(AMENITY_KEYS)) if m & required == required]
+
+
+def build_venue_doc(b, owner_id):
+    """
+    Validate a venue registration body and build the document to insert.
+    Returns (doc, None) or (None, error message). Shared by register and import.
+    """
     required = ["venue_name", "type", "address", "maps_location", "capacity"]
     miss = [k for k in required if not b.get(k)]
     if miss:
-        return err(f"Missing fields: {', '.join(miss)}", 422)
+        return None, f"Missing fields: {', '.join(miss)}"
 
     vtype = b.get("type")
     if vtype not in ["Hall", "Auditorium", "Banquet", "Lawn"]:
-        return err("Invalid 'type'. Must be one of: Hall, Auditorium, Banquet, Lawn.", 422)
+        return None, "Invalid 'type'. Must be one of: Hall, Auditorium, Banquet, Lawn."
 
     loc = b.get("maps_location") or {}
-    if "lat" not in loc or "lng" not in loc:
-        return err("'maps_location' must include 'lat' and 'lng'.", 422)
+    if not isinstance(loc, dict) or "lat" not in loc or "lng" not in loc:
+        return None, "'maps_location' must include 'lat' and 'lng'."
     try:
         lat = float(loc["lat"]); lng = float(loc["lng"])
     except Exception:
-        return err("'maps_location.lat' and 'lng' must be numbers.", 422)
+        return None, "'maps_location.lat' and 'lng' must be numbers."
 
     try:
         capacity = int(b.get("capacity"))
         if capacity <= 0: raise ValueError()
     except Exception:
-        return err("'capacity' must be a positive integer.", 422)
+        return None, "'capacity' must be a positive integer."
 
     dates_available = b.get("dates_available", [])
     if dates_available and not all(isinstance(d, str) for d in dates_available):
-        return err("'dates_available' must be an array of 'YYYY-MM-DD' strings.", 422)
+        return None, "'dates_available' must be an array of 'YYYY-MM-DD' strings."
 
     price_with_dates = b.get("price_with_dates", [])
     if price_with_dates:
         msg = validate_price_overrides(price_with_dates)
-        if msg: return err(msg, 422)
+        if msg: return None, msg
 
     space = b.get("space")
     if space is not None:
         try: space = float(space)
-        except Exception: return err("'space' (sq-ft) must be a number.", 422)
+        except Exception: return None, "'space' (sq-ft) must be a number."
 
     videos = b.get("videos", [])
     for vid in videos or []:
         if isinstance(vid, dict) and "size_mb" in vid:
             try:
                 if float(vid["size_mb"]) > MAX_VIDEO_MB:
-                    return err(f"Video exceeds {MAX_VIDEO_MB} MB limit.", 422)
+                    return None, f"Video exceeds {MAX_VIDEO_MB} MB limit."
             except Exception:
-                return err("'videos.size_mb' must be a number if provided.", 422)
+                return None, "'videos.size_mb' must be a number if provided."
 
     doc = {
-        "owner_id": request.user["_id"],
+        "owner_id": owner_id,
         "venue_name": b["venue_name"],
         "type": vtype,
         "address": b["address"],
@@ -551,18 +1317,163 @@ def register_venue():
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
+    doc["amenity_mask"] = amenity_mask(doc["amenities"])
+    return doc, None
+
+
+@app.post("/venues/register")
+@auth_required(owner_only=True)
+@idempotent("register_venue")
+def register_venue():
+    b = request.get_json(silent=True) or {}
+    doc, msg = build_venue_doc(b, request.user["_id"])
+    if msg:
+        return err(msg, 422)
     result = venues.insert_one(doc)
     return ok({"venue_id": str(result.inserted_id)}, 201)
 
 
+@app.cli.command("backfill-amenity-mask")
+def backfill_amenity_mask_command():
+    """Set amenity_mask on venues created before it existed."""
+    res = venues.update_many({"amenity_mask": {"$exists": False}}, [{"$set": {"amenity_mask": AMENITY_MASK_EXPR}}])
+    print({"updated": res.modified_count})
+
+
+def csv_venue_row(row):
+    """
+    Map a CSV row onto the register body. Columns: venue_name, type, address,
+    lat, lng, capacity, space, additional_description, the amenity flags,
+    dates_available ('2025-01-15;2025-01-16'), price_with_dates
+    ('2025-01-15:150000;...') and pictures ('url;url').
+    """
+    split = lambda v: [x.strip() for x in (v or "").split(";") if x.strip()]
+    b = {k: (row.get(k) or "").strip() for k in ["venue_name", "type", "address", "capacity", "additional_description"]}
+    if row.get("lat") or row.get("lng"):
+        b["maps_location"] = {"lat": row.get("lat"), "lng": row.get("lng")}
+    if (row.get("space") or "").strip():
+        b["space"] = row["space"].strip()
+    for k in AMENITY_KEYS:
+        b[k] = (row.get(k) or "").strip().lower() in ("1", "true", "yes", "y")
+    b["dates_available"] = split(row.get("dates_available"))
+    prices = []
+    for item in split(row.get("price_with_dates")):
+        d, _, p = item.partition(":")
+        prices.append({"date": d.strip(), "price": p.strip()})
+    b["price_with_dates"] = prices
+    b["pictures"] = split(row.get("pictures"))
+    return b
+
+
+def iter_import_rows(fmt):
+    """
+    Yield (row, body, parse_error) from the request body without buffering it.
+    row is the line number for NDJSON and the data row (header excluded) for CSV.
+    """
+    # Decode per line so a bad byte stops the import at that line, not at the
+    # start of whatever chunk a TextIOWrapper happened to be decoding.
+    text = (raw.decode("utf-8") for raw in request.stream)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for n, row in enumerate(reader, start=1):
+            yield n, csv_venue_row(row), None
+        return
+    for n, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            body = json.loads(line)
+        except ValueError:
+            yield n, None, "Invalid JSON."
+            continue
+        if not isinstance(body, dict):
+            yield n, None, "Each line must be a JSON object."
+            continue
+        yield n, body, None
+
+
+@app.post("/venues/import")
+@auth_required(owner_only=True)
+def import_venues():
+    """
+    Bulk register venues from NDJSON (one register body per line) or CSV
+    (see csv_venue_row). Format comes from ?format=ndjson|csv or Content-Type.
+    Rows are validated like /venues/register and valid ones are written with
+    unordered insert_many in batches of BULK_IMPORT_BATCH_SIZE; invalid rows
+    are reported by row number and don't stop the import.
+    """
+    ctype = (request.mimetype or "").lower()
+    fmt = request.args.get("format") or ("csv" if ctype in ("text/csv", "application/csv") else
+                                         "ndjson" if ctype in ("application/x-ndjson", "application/ndjson", "application/jsonl") else None)
+    if fmt not in ("ndjson", "csv"):
+        return err("Send NDJSON (application/x-ndjson) or CSV (text/csv), or pass ?format=ndjson|csv.", 415)
+
+    owner_id = request.user["_id"]
+    inserted, failed, errors_out = [], 0, []
+
+    def fail(row, msg):
+        nonlocal failed
+        failed += 1
+        if len(errors_out) < BULK_IMPORT_MAX_ERRORS:
+            errors_out.append({"row": row, "error": msg})
+
+    def flush(batch):
+        if not batch:
+            return
+        try:
+            res = venues.insert_many([doc for _, doc in batch], ordered=False)
+            ids = res.inserted_ids
+            inserted.extend({"row": row, "venue_id": str(i)} for (row, _), i in zip(batch, ids))
+        except errors.BulkWriteError as e:
+            bad = {we["index"]: we.get("errmsg", "Write failed.") for we in e.details.get("writeErrors", [])}
+            for idx, (row, doc) in enumerate(batch):
+                if idx in bad:
+                    fail(row, bad[idx])
+                else:
+                    inserted.append({"row": row, "venue_id": str(doc["_id"])})
+        batch.clear()
+
+    batch, truncated, read_error = [], False, None
+    try:
+        for row, body, parse_error in iter_import_rows(fmt):
+            if row > BULK_IMPORT_MAX_ROWS:
+                truncated = True
+                break
+            if parse_error:
+                fail(row, parse_error)
+                continue
+            try:
+                doc, msg = build_venue_doc(body, owner_id)
+            except (TypeError, ValueError, AttributeError, KeyError):
+                doc, msg = None, "Malformed row."
+            if msg:
+                fail(row, msg)
+                continue
+            batch.append((row, doc))
+            if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+                flush(batch)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Rows before the bad bytes are kept; report them with the decode error.
+        read_error = f"Could not read upload: {e}"
+    flush(batch)
+
+    return ok({
+        "inserted": len(inserted),
+        "failed": failed,
+        "truncated": truncated,
+        "read_error": read_error,
+        "venues": inserted,
+        "errors": errors_out,
+    }, 201 if inserted else 400 if read_error else 200)
+
+
 @app.patch("/venues/<venue_id>")
 @auth_required(owner_only=True)
 def update_venue(venue_id):
-    v = venues.find_one({"_id": ObjectId(venue_id)})
-    if not v:
-        return err("Venue not found.", 404)
-    if str(v["owner_id"]) != str(request.user["_id"]):
-        return err("You do not own this venue.", 403)
+    try:
+        v_id = ObjectId(venue_id)
+    except Exception:
+        return err("Invalid venue_id.", 400)
 
     b = request.get_json(silent=True) or {}
     update = {"updated_at": datetime.utcnow()}
@@ -598,10 +1509,9 @@ def update_venue(venue_id):
         try: update["space_sqft"] = float(b["space"])
         except Exception: return err("'space' (sq-ft) must be a number.", 422)
     # amenities
-    for k in ["parking_valet","entry_package","water","air_conditioner","partition_facility","sound_system"]:
+    for k in AMENITY_KEYS:
         if k in b:
-            update.setdefault("amenities", v.get("amenities", {}))
-            update["amenities"][k] = bool(b[k])
+            update[f"amenities.{k}"] = bool(b[k])
     # media
     if "pictures" in b: update["pictures"] = b["pictures"]
     if "videos" in b:
@@ -614,22 +1524,26 @@ def update_venue(venue_id):
                     return err("'videos.size_mb' must be a number if provided.", 422)
         update["videos"] = b["videos"]
 
-    venues.update_one({"_id": v["_id"]}, {"$set": update})
-    v2 = venues.find_one({"_id": v["_id"]})
-    return ok({"venue": {
-        "id": str(v2["_id"]),
-        "venue_name": v2.get("venue_name"),
-        "type": v2.get("type"),
-        "address": v2.get("address"),
-        "maps_location": v2.get("maps_location"),
-        "capacity": v2.get("capacity"),
-        "dates_available": v2.get("dates_available", []),
-        "pricing": v2.get("pricing", {}),
-        "space_sqft": v2.get("space_sqft"),
-        "amenities": v2.get("amenities", {}),
-        "pictures": v2.get("pictures", []),
-        "videos": v2.get("videos", [])
-    }})
+    if any(k.startswith("amenities.") for k in update):
+        # Pipeline update so amenity_mask is recomputed from the merged amenities
+        # server-side; $literal keeps user strings like "$x" from being read as paths
+        change = [{"$set": {k: {"$literal": val} for k, val in update.items()}},
+                  {"$set": {"amenity_mask": AMENITY_MASK_EXPR}}]
+    else:
+        change = {"$set": update}
+    # Ownership is part of the filter, so the write and the check are one round trip
+    v2 = venues.find_one_and_update(
+        {"_id": v_id, "owner_id": request.user["_id"]},
+        change,
+        return_document=ReturnDocument.AFTER
+    )
+    if not v2:
+        if venues.find_one({"_id": v_id}, {"_id": 1}):
+            return err("You do not own this venue.", 403)
+        return err("Venue not found.", 404)
+    if "dates_available" in update:
+        publish_dates_change(v2)
+    return ok({"venue": venue_public_doc(v2)})
 
 
 
@@ -637,15 +1551,43 @@ def update_venue(venue_id):
 
 
 # -------------------- Venues: Search (Public/User) --------------------
-@app.get("/venues/search")
-def search_venues():
+def venue_public_doc(v):
+    return {
+        "id": str(v["_id"]),
+        "venue_name": v.get("venue_name"),
+        "type": v.get("type"),
+        "address": v.get("address"),
+        "maps_location": v.get("maps_location"),
+        "capacity": v.get("capacity"),
+        "dates_available": v.get("dates_available", []),
+        "pricing": v.get("pricing", {}),
+        "space_sqft": v.get("space_sqft"),
+        "amenities": v.get("amenities", {}),
+        "pictures": v.get("pictures", []),
+        "videos": v.get("videos", [])
+    }
+
+
+def arg_number(args, name, cast):
+    # Same semantics as args.get(name, type=cast): missing or malformed -> None
+    try:
+        return cast(args[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def search_query(args):
+    """
+    Build the venue search filter from query params -> (query, None) or (None, error message).
+    'args' is any str -> str mapping (Flask request args or Starlette query params).
+    """
     q = {}
-    vtype = request.args.get("type")
+    vtype = args.get("type")
     if vtype:
         q["type"] = vtype
 
-    cap_min = request.args.get("capacity_min", type=int)
-    cap_max = request.args.get("capacity_max", type=int)
+    cap_min = arg_number(args, "capacity_min", int)
+    cap_max = arg_number(args, "capacity_max", int)
     if cap_min is not None or cap_max is not None:
         q["capacity"] = {}
         if cap_min is not None:
@@ -655,13 +1597,21 @@ def search_venues():
         if not q["capacity"]:
             q.pop("capacity")
 
-    date = request.args.get("date")
+    date = args.get("date")
     if date:
         q["dates_available"] = date
 
-    near_lat = request.args.get("near_lat", type=float)
-    near_lng = request.args.get("near_lng", type=float)
-    near_km = request.args.get("near_km", type=float)
+    # ?amenities=parking_valet,air_conditioner -> venues having all of them
+    wanted = [a.strip() for a in (args.get("amenities") or "").split(",") if a.strip()]
+    if wanted:
+        unknown = [a for a in wanted if a not in AMENITY_KEYS]
+        if unknown:
+            return None, f"Unknown amenities: {', '.join(unknown)}. Allowed: {', '.join(AMENITY_KEYS)}."
+        q["amenity_mask"] = {"$in": masks_with_all(wanted)}
+
+    near_lat = arg_number(args, "near_lat", float)
+    near_lng = arg_number(args, "near_lng", float)
+    near_km = arg_number(args, "near_km", float)
     if near_lat is not None and near_lng is not None and near_km is not None:
         q["maps_location"] = {
             "$near": {
@@ -670,8 +1620,8 @@ def search_venues():
             }
         }
 
-    price_min = request.args.get("price_min", type=float)
-    price_max = request.args.get("price_max", type=float)
+    price_min = arg_number(args, "price_min", float)
+    price_max = arg_number(args, "price_max", float)
     if price_min is not None or price_max is not None:
         elem = {}
         if date:
@@ -682,36 +1632,20 @@ def search_venues():
             elem["price"] = {**elem.get("price", {}), "$lte": price_max}
         q["pricing.overrides"] = {"$elemMatch": elem} if elem else {"$exists": True}
 
-    cur = venues.find(q).limit(50)
-    out = []
-    for v in cur:
-        out.append({
-            "id": str(v["_id"]),
-            "venue_name": v.get("venue_name"),
-            "type": v.get("type"),
-            "address": v.get("address"),
-            "maps_location": v.get("maps_location"),
-            "capacity": v.get("capacity"),
-            "dates_available": v.get("dates_available", []),
-            "pricing": v.get("pricing", {}),
-            "space_sqft": v.get("space_sqft"),
-            "amenities": v.get("amenities", {}),
-            "pictures": v.get("pictures", []),
-            "videos": v.get("videos", [])
-        })
-    return ok({"venues": out})
+    return q, None
 
 
-# -------------------- Bookings: CRUD with availability checks --------------------
-def compute_price_for_date(venue, date_str):
-    for o in venue.get("pricing", {}).get("overrides", []):
-        if o.get("date") == date_str:
-            try:
-                return float(o.get("price"))
-            except Exception:
-                return None
-    return None
+@app.get("/venues/search")
+def search_venues():
+    q, msg = search_query(request.args)
+    if msg:
+        return err(msg, 422)
 
+    cur = venues_read.find(q).limit(50)
+    return ok({"venues": [venue_public_doc(v) for v in cur]})
+
+
+# -------------------- Bookings: CRUD with availability checks --------------------
 def resolve_price_for_date(venue: dict, date_str: str):
     """
     Returns the price for a given YYYY-MM-DD date from venue.pricing.overrides,
@@ -727,7 +1661,106 @@ def resolve_price_for_date(venue: dict, date_str: str):
     return None
 
 
-from bson import ObjectId  # you already import this above
+def venue_price_map(venue):
+    """{date: price} from venue.pricing.overrides, for pricing many dates at once."""
+    out = {}
+    for item in (venue.get("pricing") or {}).get("overrides") or []:
+        try:
+            out.setdefault(item.get("date"), float(item.get("price")))
+        except Exception:
+            out.setdefault(item.get("date"), None)
+    return out
+
+
+def valid_date(d):
+    try:
+        datetime.strptime(d, "%Y-%m-%d")
+    except ValueError:
+        return False
+    return True
+
+
+def booking_dates(b):
+    """
+    Dates requested by a create_booking body as (sorted unique list, None),
+    (None, error message), or (None, None) when no date field was given.
+    """
+    if b.get("date"):
+        d = b["date"]
+        if not isinstance(d, str) or not valid_date(d):
+            return None, "'date' must be a 'YYYY-MM-DD' string."
+        return [d], None
+    if b.get("dates") is not None:
+        dates = b["dates"]
+        if not isinstance(dates, list) or not dates or not all(isinstance(d, str) for d in dates):
+            return None, "'dates' must be a non-empty array of 'YYYY-MM-DD' strings."
+    elif b.get("date_from") or b.get("date_to"):
+        try:
+            start = datetime.strptime(str(b.get("date_from")), "%Y-%m-%d").date()
+            end = datetime.strptime(str(b.get("date_to")), "%Y-%m-%d").date()
+        except ValueError:
+            return None, "'date_from' and 'date_to' must both be 'YYYY-MM-DD'."
+        if end < start:
+            return None, "'date_to' must not be before 'date_from'."
+        if (end - start).days >= MAX_BOOKING_DAYS:
+            return None, f"At most {MAX_BOOKING_DAYS} dates can be booked at once."
+        dates = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    else:
+        return None, None
+
+    dates = sorted(set(dates))
+    if len(dates) > MAX_BOOKING_DAYS:
+        return None, f"At most {MAX_BOOKING_DAYS} dates can be booked at once."
+    for d in dates:
+        if not valid_date(d):
+            return None, f"Invalid date '{d}', expected 'YYYY-MM-DD'."
+    return dates, None
+
+
+_transactions_supported = None
+
+
+def transactions_supported():
+    """Multi-document transactions need a replica set or sharded cluster."""
+    global _transactions_supported
+    if _transactions_supported is None:
+        try:
+            hello = client.admin.command("hello")
+            _transactions_supported = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+        except Exception:
+            return False  # unknown yet (or a stand-in without 'hello'); ask again next time
+    return _transactions_supported
+
+
+def insert_bookings(docs):
+    """
+    Insert all per-date booking rows or none: in a transaction when the
+    deployment supports one, otherwise one ordered insert_many whose partial
+    result is removed again on failure. A date taken concurrently fails the
+    insert on uniq_booking_active_v_d (see is_duplicate_key).
+    """
+    if len(docs) == 1:
+        bookings.insert_one(docs[0])
+        return
+    if transactions_supported():
+        with client.start_session() as session:
+            session.with_transaction(lambda s: bookings.insert_many(docs, ordered=True, session=s))
+        return
+    try:
+        bookings.insert_many(docs, ordered=True)
+    except errors.PyMongoError:
+        bookings.delete_many({"_id": {"$in": [d["_id"] for d in docs if "_id" in d]}})
+        raise
+
+
+
+def is_duplicate_key(e):
+    if isinstance(e, errors.DuplicateKeyError):
+        return True
+    if isinstance(e, errors.BulkWriteError):
+        return any(we.get("code") == 11000 for we in e.details.get("writeErrors", []))
+    return False
+
 
 @app.get("/venues/<venue_id>/availability")
 def venue_availability(venue_id):
@@ -744,7 +1777,7 @@ def venue_availability(venue_id):
     except Exception:
         return err("Invalid venue_id.", 400)
 
-    venue = venues.find_one({"_id": v_id})
+    venue = venues_read.find_one({"_id": v_id})
     if not venue:
         return err("Venue not found.", 404)
 
@@ -752,8 +1785,9 @@ def venue_availability(venue_id):
     if date_str not in (venue.get("dates_available") or []):
         return ok({"available": False, "price": None})
 
-    # Not already booked (pending or confirmed)
-    existing = bookings.find_one({
+    # Not already booked (pending or confirmed). Display only: create_booking
+    # re-checks on the primary, so a slightly stale answer here is safe.
+    existing = bookings_read.find_one({
         "venue_id": venue["_id"],
         "date": date_str,
         "status": {"$in": ["pending", "confirmed"]}
@@ -765,6 +1799,92 @@ def venue_availability(venue_id):
 
 
 
+def booking_list_doc(b):
+    return {
+        "id": str(b["_id"]),
+        "venue_id": str(b["venue_id"]),
+        "user_id": str(b["user_id"]),
+        "date": b.get("date"),
+        "guests": b.get("guests"),
+        "status": b.get("status"),
+        "price_locked": b.get("price_locked"),
+        "group_id": str(b["group_id"]) if b.get("group_id") else None,
+        "created_at": b.get("created_at"),
+        "updated_at": b.get("updated_at"),
+    }
+
+
+def booking_request_doc(bk, with_user=True):
+    # my-requests leaves out user_id (it is always the caller); for-my-venues includes it
+    doc = {
+        "id": str(bk["_id"]),
+        "venue_id": str(bk["venue_id"]),
+        "user_id": str(bk["user_id"]),
+        "date": bk["date"],
+        "guests": bk.get("guests"),
+        "price_locked": bk.get("price_locked"),
+        "status": bk.get("status"),
+        "group_id": str(bk["group_id"]) if bk.get("group_id") else None,
+        "notes": bk.get("notes", "")
+    }
+    if not with_user:
+        doc.pop("user_id")
+    return doc
+
+
+def booking_status_doc(bk):
+    return {
+        "id": str(bk["_id"]),
+        "venue_id": str(bk["venue_id"]),
+        "user_id": str(bk["user_id"]),
+        "date": bk["date"],
+        "guests": bk["guests"],
+        "price_locked": bk.get("price_locked"),
+        "status": bk["status"],
+        "notes": bk.get("notes", "")
+    }
+
+
+def booking_venue_owner_id(bk):
+    """
+    Owner of the booked venue. New bookings carry it as 'venue_owner_id';
+    older ones fall back to a venue lookup.
+    """
+    if "venue_owner_id" in bk:
+        return bk["venue_owner_id"]
+    v = venues.find_one({"_id": bk["venue_id"]}, {"owner_id": 1})
+    return v["owner_id"] if v else None
+
+
+def backfill_venue_owner_id(batch_size=200):
+    """
+    Copy the venue's owner_id onto bookings created before 'venue_owner_id' was
+    stored, batch_size venues per bulk write, so owner updates take the one
+    round trip path and owners get live events for those bookings too.
+    """
+    last_id, n_venues, n_bookings = None, 0, 0
+    while True:
+        q = {"_id": {"$gt": last_id}} if last_id else {}
+        batch = list(venues.find(q, {"owner_id": 1}).sort("_id", ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        ops = [UpdateMany({"venue_id": v["_id"], "venue_owner_id": {"$exists": False}},
+                          {"$set": {"venue_owner_id": v["owner_id"]}})
+               for v in batch if v.get("owner_id")]
+        if ops:
+            n_bookings += bookings.bulk_write(ops, ordered=False).modified_count
+        n_venues += len(batch)
+    return {"venues": n_venues, "bookings_updated": n_bookings}
+
+
+@app.cli.command("backfill-venue-owner-id")
+def backfill_venue_owner_id_command():
+    """Set venue_owner_id on bookings created before it was stored."""
+    batch_size = int(os.getenv("BACKFILL_BATCH_SIZE", "200"))
+    print(backfill_venue_owner_id(batch_size=batch_size))
+
+
 @app.delete("/bookings/<booking_id>")
 @auth_required()
 def cancel_booking(booking_id):
@@ -773,27 +1893,43 @@ def cancel_booking(booking_id):
     except Exception:
         return err("Invalid booking_id.", 400)
 
+    user_id = request.user["_id"]
+    now = datetime.utcnow()
+    b = bookings.find_one_and_update(
+        {
+            "_id": b_id,
+            "status": {"$ne": "cancelled"},
+            "$or": [{"user_id": user_id}, {"venue_owner_id": user_id}]
+        },
+        {"$set": {"status": "cancelled", "updated_at": now}},
+        return_document=ReturnDocument.BEFORE  # previous status feeds the rollups
+    )
+    if b:
+        record_booking_transition(b, b.get("status"), "cancelled")
+        publish_booking_change({**b, "status": "cancelled", "updated_at": now})
+        return ok({"cancelled": True})
+
+    # Slow path: work out why the filter did not match
     b = bookings.find_one({"_id": b_id})
     if not b:
         return err("Booking not found.", 404)
 
-    v = venues.find_one({"_id": b["venue_id"]})
-    if not v:
-        return err("Venue not found for booking.", 404)
-
-    user = request.user
-    is_booker = b["user_id"] == user["_id"]
-    is_owner = v["owner_id"] == user["_id"]
+    is_booker = b["user_id"] == user_id
+    is_owner = booking_venue_owner_id(b) == user_id
     if not (is_booker or is_owner):
         return err("Not allowed to cancel this booking.", 403)
 
     if b.get("status") == "cancelled":
         return ok({"cancelled": True})
 
-    bookings.update_one(
-        {"_id": b["_id"]},
-        {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}}
+    # Owner of a booking created before 'venue_owner_id' was stored
+    res = bookings.update_one(
+        {"_id": b["_id"], "status": {"$ne": "cancelled"}},
+        {"$set": {"status": "cancelled", "updated_at": now}}
     )
+    if res.modified_count:
+        record_booking_transition(b, b.get("status"), "cancelled")
+        publish_booking_change({**b, "status": "cancelled", "updated_at": now})
     return ok({"cancelled": True})
 
 @app.get("/bookings")
@@ -813,26 +1949,14 @@ def list_bookings():
         query = {"user_id": user["_id"]}
 
     cur = bookings.find(query).sort("date", 1).limit(200)
-    out = []
-    for b in cur:
-        out.append({
-            "id": str(b["_id"]),
-            "venue_id": str(b["venue_id"]),
-            "user_id": str(b["user_id"]),
-            "date": b.get("date"),
-            "guests": b.get("guests"),
-            "status": b.get("status"),
-            "price_locked": b.get("price_locked"),
-            "created_at": b.get("created_at"),
-            "updated_at": b.get("updated_at"),
-        })
-    return ok({"bookings": out})
+    return ok({"bookings": [booking_list_doc(b) for b in cur]})
 
 
 
 
 @app.post("/bookings")
 @auth_required(owner_only=False)
+@idempotent("create_booking")
 def create_booking():
     """
     Request JSON:
@@ -842,14 +1966,20 @@ def create_booking():
       "guests": 300,
       "notes": "optional"
     }
+    Several days at once: "dates": ["2025-09-01", "2025-09-02"] or
+    "date_from": "2025-09-01", "date_to": "2025-09-03" (inclusive) instead
+    of "date". All dates are booked together or none are.
     """
     b = request.get_json(silent=True) or {}
     venue_id = b.get("venue_id")
-    date_str = b.get("date")
     guests = b.get("guests")
 
-    if not venue_id or not date_str or guests is None:
-        return err("Fields 'venue_id', 'date', 'guests' are required.", 422)
+    dates, msg = booking_dates(b)
+    if not venue_id or guests is None or (dates is None and msg is None):
+        return err("Fields 'venue_id', 'date' (or 'dates' / 'date_from' + 'date_to'), 'guests' are required.", 422)
+    if msg:
+        return err(msg, 422)
+    multi = not b.get("date")  # same test booking_dates uses
     try:
         guests = int(guests); 
         if guests <= 0: raise ValueError()
@@ -863,50 +1993,76 @@ def create_booking():
     if not v:
         return err("Venue not found.", 404)
 
-    if date_str not in (v.get("dates_available") or []):
-        return err("Venue not available on that date.", 409)
+    open_dates = set(v.get("dates_available") or [])
+    closed = [d for d in dates if d not in open_dates]
+    if closed:
+        if not multi:
+            return err("Venue not available on that date.", 409)
+        return err(f"Venue not available on: {', '.join(closed)}.", 409)
 
-    # Check if already booked (pending or confirmed)
-    existing = bookings.find_one({
+    # Check if already booked (pending or confirmed), all dates in one indexed query
+    taken = sorted({bk["date"] for bk in bookings.find({
         "venue_id": v["_id"],
-        "date": date_str,
+        "date": {"$in": dates},
         "status": {"$in": ["pending", "confirmed"]}
-    })
-    if existing:
-        return err("Date already booked or pending.", 409)
+    }, {"date": 1})})
+    if taken:
+        if not multi:
+            return err("Date already booked or pending.", 409)
+        return err(f"Already booked or pending: {', '.join(taken)}.", 409)
+
+    prices = venue_price_map(v)
+    now = datetime.utcnow()
+    group_id = ObjectId() if multi else None
+    docs = []
+    for d in dates:
+        doc = {
+            "venue_id": v["_id"],
+            "venue_owner_id": v["owner_id"],  # lets owner checks live in update filters
+            "user_id": request.user["_id"],
+            "date": d,
+            "guests": guests,
+            "price_locked": prices.get(d),
+            "status": "pending",
+            "notes": b.get("notes", ""),
+            "created_at": now,
+            "updated_at": now
+        }
+        if group_id:
+            doc["group_id"] = group_id
+        docs.append(doc)
 
-    price = compute_price_for_date(v, date_str)
-    doc = {
-        "venue_id": v["_id"],
-        "user_id": request.user["_id"],
-        "date": date_str,
-        "guests": guests,
-        "price_locked": price,
-        "status": "pending",
-        "notes": b.get("notes", ""),
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    }
-    res = bookings.insert_one(doc)
-    return ok({"booking_id": str(res.inserted_id), "price": price, "status": "pending"}, 201)
+    try:
+        insert_bookings(docs)
+    except errors.PyMongoError as e:
+        if is_duplicate_key(e):
+            # Lost a race with a concurrent booking for one of the dates
+            if not multi:
+                return err("Date already booked or pending.", 409)
+            return err("One or more dates were just booked by someone else; no dates were booked.", 409)
+        print(f"[BOOKING] insert failed for venue {v['_id']} dates {dates}: {e}")
+        return err("Could not create the booking; no dates were booked. Please retry.", 500)
+    record_booking_transitions(docs, None, "pending")
+    for doc in docs:
+        publish_booking_change(doc)
+
+    if not multi:
+        doc = docs[0]
+        return ok({"booking_id": str(doc["_id"]), "price": doc["price_locked"], "status": "pending"}, 201)
+    priced = [d["price_locked"] for d in docs if d["price_locked"] is not None]
+    return ok({
+        "group_id": str(group_id),
+        "bookings": [{"booking_id": str(d["_id"]), "date": d["date"], "price": d["price_locked"]} for d in docs],
+        "total_price": sum(priced) if priced else None,  # null like 'price' when no date is priced
+        "status": "pending"
+    }, 201)
 
 
 @app.get("/bookings/my-requests")
 @auth_required(owner_only=False)
 def my_bookings():
     cur = bookings.find({"user_id": request.user["_id"]}).sort("created_at", ASCENDING)
-    data = []
-    for bk in cur:
-        data.append({
-            "id": str(bk["_id"]),
-            "venue_id": str(bk["venue_id"]),
-            "date": bk["date"],
-            "guests": bk.get("guests"),
-            "price_locked": bk.get("price_locked"),
-            "status": bk.get("status"),
-            "notes": bk.get("notes", "")
-        })
-    return ok({"bookings": data})
+    return ok({"bookings": [booking_request_doc(bk, with_user=False) for bk in cur]})
 
 
 @app.get("/bookings/for-my-venues")
@@ -918,19 +2074,7 @@ def bookings_for_owner():
     if status:
         q["status"] = status
     cur = bookings.find(q).sort("date", ASCENDING)
-    data = []
-    for bk in cur:
-        data.append({
-            "id": str(bk["_id"]),
-            "venue_id": str(bk["venue_id"]),
-            "user_id": str(bk["user_id"]),
-            "date": bk["date"],
-            "guests": bk.get("guests"),
-            "price_locked": bk.get("price_locked"),
-            "status": bk.get("status"),
-            "notes": bk.get("notes", "")
-        })
-    return ok({"bookings": data})
+    return ok({"bookings": [booking_request_doc(bk) for bk in cur]})
 
 
 @app.patch("/bookings/<booking_id>")
@@ -942,42 +2086,513 @@ def update_booking(booking_id):
         return err("Status must be one of: confirmed, rejected, cancelled.", 422)
 
     try:
-        bk = bookings.find_one({"_id": ObjectId(booking_id)})
+        b_id = ObjectId(booking_id)
     except Exception:
         return err("Invalid booking_id.", 422)
-    if not bk:
-        return err("Booking not found.", 404)
-
-    # Owner or booker actions
-    is_owner = False
-    v = venues.find_one({"_id": bk["venue_id"]})
-    if v and str(v["owner_id"]) == str(request.user["_id"]):
-        is_owner = True
 
+    user_id = request.user["_id"]
     if new_status in ["confirmed", "rejected"]:
-        if not is_owner:
-            return err("Only the venue owner can confirm/reject.", 403)
-        if bk["status"] != "pending":
-            return err("Only pending bookings can be confirmed/rejected.", 409)
-    if new_status == "cancelled":
+        q = {"_id": b_id, "venue_owner_id": user_id, "status": "pending"}
+    else:
         # Booker can cancel their own; owner can also cancel? We'll allow booker only
-        if str(bk["user_id"]) != str(request.user["_id"]):
+        q = {"_id": b_id, "user_id": user_id}
+    update = {"$set": {"status": new_status, "updated_at": datetime.utcnow()}}
+
+    # BEFORE: the previous status feeds the rollups; the new state is built locally
+    bk = bookings.find_one_and_update(q, update, return_document=ReturnDocument.BEFORE)
+    if not bk:
+        # Slow path: report why the filter did not match
+        bk = bookings.find_one({"_id": b_id})
+        if not bk:
+            return err("Booking not found.", 404)
+        if new_status in ["confirmed", "rejected"]:
+            if booking_venue_owner_id(bk) != user_id:
+                return err("Only the venue owner can confirm/reject.", 403)
+            if bk["status"] != "pending":
+                return err("Only pending bookings can be confirmed/rejected.", 409)
+            # Owner of a booking created before 'venue_owner_id' was stored
+            bk = bookings.find_one_and_update(
+                {"_id": b_id, "status": "pending"}, update, return_document=ReturnDocument.BEFORE
+            )
+            if not bk:
+                return err("Only pending bookings can be confirmed/rejected.", 409)
+        else:
             return err("Only the booking user can cancel.", 403)
 
-    bookings.update_one({"_id": bk["_id"]}, {"$set": {"status": new_status, "updated_at": datetime.utcnow()}})
-    bk2 = bookings.find_one({"_id": bk["_id"]})
-    return ok({
-        "booking": {
-            "id": str(bk2["_id"]),
-            "venue_id": str(bk2["venue_id"]),
-            "user_id": str(bk2["user_id"]),
-            "date": bk2["date"],
-            "guests": bk2["guests"],
-            "price_locked": bk2.get("price_locked"),
-            "status": bk2["status"],
-            "notes": bk2.get("notes", "")
-        }
+    bk2 = {**bk, **update["$set"]}
+    record_booking_transition(bk, bk.get("status"), new_status)
+    publish_booking_change(bk2)
+    return ok({"booking": booking_status_doc(bk2)})
+
+
+# -------------------- Analytics: owner rollups --------------------
+BOOKING_STATUSES = ["pending", "confirmed", "rejected", "cancelled"]
+
+
+def record_booking_transition(bk, old_status, new_status):
+    """
+    Incrementally maintain booking_rollups for the booking's venue and month.
+    old_status is None for a new booking. Revenue counts price_locked of
+    confirmed bookings; confirmed bookings are also the occupied days.
+    A failed rollup write is logged, not surfaced: `flask rebuild-rollups`
+    recomputes everything from the bookings collection.
+    """
+    record_booking_transitions([bk], old_status, new_status)
+
+
+def record_booking_transitions(bks, old_status, new_status):
+    """Same as record_booking_transition for many bookings, one write per call."""
+    if old_status == new_status:
+        return
+    incs = {}  # (venue_id, month) -> ($inc, owner_id)
+    for bk in bks:
+        if not bk.get("date"):
+            continue
+        key = (bk["venue_id"], bk["date"][:7])
+        if key not in incs:
+            owner_id = bk["venue_owner_id"] if "venue_owner_id" in bk else booking_venue_owner_id(bk)
+            incs[key] = ({}, owner_id)
+        delta = {f"status.{new_status}": 1}
+        if old_status is None:
+            delta["requests"] = 1
+        else:
+            delta[f"status.{old_status}"] = -1
+        price = bk.get("price_locked") or 0
+        if new_status == "confirmed":
+            delta["revenue"] = price
+        elif old_status == "confirmed":
+            delta["revenue"] = -price
+        inc = incs[key][0]
+        for f, n in delta.items():
+            inc[f] = inc.get(f, 0) + n
+    if not incs:
+        return
+
+    now = datetime.utcnow()
+    ops = [UpdateOne({"venue_id": venue_id, "month": month},
+                     {"$inc": inc, "$set": {"updated_at": now}, "$setOnInsert": {"owner_id": owner_id}},
+                     upsert=True)
+           for (venue_id, month), (inc, owner_id) in incs.items()]
+    try:
+        try:
+            booking_rollups.bulk_write(ops, ordered=False)
+        except errors.BulkWriteError as e:
+            # Lost a concurrent upsert: retry just those, the rest were applied
+            lost = [ops[we["index"]] for we in e.details.get("writeErrors", []) if we.get("code") == 11000]
+            if len(lost) != len(e.details.get("writeErrors", [])):
+                raise
+            booking_rollups.bulk_write(lost, ordered=False)
+    except errors.PyMongoError as e:
+        print(f"[ROLLUP] failed for bookings {[str(bk.get('_id')) for bk in bks]}: {e}")
+
+
+def rollup_pipeline(venue_ids):
+    group = {
+        "_id": {"venue_id": "$venue_id", "month": {"$substrBytes": ["$date", 0, 7]}},
+        "requests": {"$sum": 1},
+        "revenue": {"$sum": {"$cond": [{"$eq": ["$status", "confirmed"]}, {"$ifNull": ["$price_locked", 0]}, 0]}},
+    }
+    for st in BOOKING_STATUSES:
+        group[st] = {"$sum": {"$cond": [{"$eq": ["$status", st]}, 1, 0]}}
+    return [
+        {"$match": {"venue_id": {"$in": venue_ids}, "date": {"$type": "string"}}},
+        {"$group": group},
+    ]
+
+
+def rebuild_rollups(batch_size=200):
+    """
+    Recompute booking_rollups from scratch, batch_size venues at a time, so
+    each aggregation and bulk write stays bounded. Incremental updates that
+    land on a batch while it is being rebuilt can be overwritten; run it when
+    booking traffic is low.
+    """
+    started = datetime.utcnow()
+    last_id, n_venues, n_rows = None, 0, 0
+    while True:
+        q = {"_id": {"$gt": last_id}} if last_id else {}
+        batch = list(venues.find(q, {"owner_id": 1}).sort("_id", ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        owners = {v["_id"]: v.get("owner_id") for v in batch}
+
+        ops = []
+        for row in bookings.aggregate(rollup_pipeline(list(owners)), allowDiskUse=True):
+            key = {"venue_id": row["_id"]["venue_id"], "month": row["_id"]["month"]}
+            ops.append(ReplaceOne(key, {
+                **key,
+                "owner_id": owners.get(key["venue_id"]),
+                "requests": row["requests"],
+                "status": {st: row[st] for st in BOOKING_STATUSES},
+                "revenue": row["revenue"],
+                "updated_at": started,
+                "rebuilt_at": started,
+            }, upsert=True))
+        if ops:
+            booking_rollups.bulk_write(ops, ordered=False)
+        # Months that no longer have any bookings
+        booking_rollups.delete_many({"venue_id": {"$in": list(owners)}, "rebuilt_at": {"$ne": started}})
+        n_venues += len(batch)
+        n_rows += len(ops)
+    return {"venues": n_venues, "rollups": n_rows}
+
+
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute owner analytics rollups from the bookings collection."""
+    batch_size = int(os.getenv("ROLLUP_BATCH_SIZE", "200"))
+    print(rebuild_rollups(batch_size=batch_size))
+
+
+def days_in_month(dates, month):
+    return sum(1 for d in dates if isinstance(d, str) and d.startswith(month))
+
+
+@app.get("/analytics/owner")
+@auth_required(owner_only=True)
+def owner_analytics():
+    """
+    Query: ?from=YYYY-MM&to=YYYY-MM (inclusive, optional) &venue_id=... (optional)
+    Per venue per month: requests, status counts, revenue (sum of
+    price_locked over confirmed bookings) and occupancy (confirmed days /
+    days listed in dates_available for that month).
+    """
+    month_re = re.compile(r"^\d{4}-\d{2}$")
+    m_from = request.args.get("from")
+    m_to = request.args.get("to")
+    for m in (m_from, m_to):
+        if m and not month_re.match(m):
+            return err("'from' and 'to' must be YYYY-MM.", 422)
+
+    # Rollups carry owner_id (idx_rollup_owner_month); venues are only needed
+    # for names and the dates_available behind occupancy
+    q = {"owner_id": request.user["_id"]}
+    if request.args.get("venue_id"):
+        try:
+            q["venue_id"] = ObjectId(request.args["venue_id"])
+        except Exception:
+            return err("Invalid venue_id.", 400)
+    if m_from or m_to:
+        q["month"] = {}
+        if m_from: q["month"]["$gte"] = m_from
+        if m_to: q["month"]["$lte"] = m_to
+
+    rows = list(booking_rollups.find(q).sort([("month", ASCENDING), ("venue_id", ASCENDING)]))
+    if not rows:
+        return ok({"months": []})
+    owned = {v["_id"]: v for v in venues.find(
+        {"_id": {"$in": list({r["venue_id"] for r in rows})}, "owner_id": request.user["_id"]},
+        {"venue_name": 1, "dates_available": 1}
+    )}
+
+    out = []
+    for r in rows:
+        v = owned.get(r["venue_id"])
+        if v is None:
+            continue  # venue deleted since
+        status = r.get("status", {})
+        available = days_in_month(v.get("dates_available") or [], r["month"])
+        confirmed = status.get("confirmed", 0)
+        out.append({
+            "venue_id": str(r["venue_id"]),
+            "venue_name": v.get("venue_name"),
+            "month": r["month"],
+            "requests": r.get("requests", 0),
+            **{st: status.get(st, 0) for st in BOOKING_STATUSES},
+            "revenue": r.get("revenue", 0),
+            "available_days": available,
+            "occupancy": round(confirmed / available, 4) if available else None,
+        })
+    return ok({"months": out})
+
+
+# -------------------- Events: live availability (SSE) --------------------
+class EventHub:
+    """
+    In-process pub/sub behind the SSE endpoints. Subscribers get a bounded
+    queue; a subscriber that falls SSE_QUEUE_SIZE events behind is dropped
+    (its EventSource reconnects) instead of buffering without limit.
+
+    Events come from a Mongo change stream when the deployment supports one
+    (replica set / Atlas); otherwise the booking handlers publish directly.
+    """
+
+    def __init__(self, max_connections, queue_size):
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self.mode = None  # decided on first subscription: "change_stream" | "local"
+        self._lock = threading.Lock()
+        self._subs = {}  # topic -> set of subscriber queues
+        self._connections = 0
+        self._seq = 0
+        self._published = 0
+        self._dropped = 0
+        self._latencies = deque(maxlen=1024)  # fan-out latency samples (seconds)
+        self._latency_max = 0.0
+
+    # ---- subscriptions ----
+    def subscribe(self, topics):
+        with self._lock:
+            if self._connections >= self.max_connections:
+                return None
+            q = queue.Queue(maxsize=self.queue_size)
+            q.closed = False
+            q.released = False
+            for t in topics:
+                self._subs.setdefault(t, set()).add(q)
+            self._connections += 1
+        self.ensure_source()
+        return q
+
+    def unsubscribe(self, q, topics):
+        # Idempotent: the stream generator and the response close hook both call it
+        with self._lock:
+            if q.released:
+                return
+            q.released = True
+            for t in topics:
+                subs = self._subs.get(t)
+                if subs and q in subs:
+                    subs.discard(q)
+                    if not subs:
+                        self._subs.pop(t, None)
+            self._connections -= 1
+
+    def has_subscribers(self, topics):
+        with self._lock:
+            return any(t in self._subs for t in topics)
+
+    # ---- publishing ----
+    def publish(self, topic, event_type, data):
+        with self._lock:
+            subs = list(self._subs.get(topic, ()))
+            if not subs:
+                return 0
+            self._seq += 1
+            event = {"id": self._seq, "type": event_type, "data": data, "ts": time.monotonic()}
+            self._published += 1
+        for q in subs:
+            if q.closed:
+                continue
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                q.closed = True  # slow consumer: stream ends, client reconnects
+                with self._lock:
+                    self._dropped += 1
+        return len(subs)
+
+    def publish_local(self, topic, event_type, data):
+        # Handlers call this; with a live change stream the stream is the source
+        if self.mode == "change_stream":
+            return 0
+        return self.publish(topic, event_type, data)
+
+    def record_delivery(self, event):
+        lat = time.monotonic() - event["ts"]
+        with self._lock:
+            self._latencies.append(lat)
+            if lat > self._latency_max:
+                self._latency_max = lat
+
+    def stats(self):
+        with self._lock:
+            lats = sorted(self._latencies)
+            pick = lambda p: round(lats[min(len(lats) - 1, int(p * len(lats)))] * 1000, 3) if lats else None
+            return {
+                "mode": self.mode,
+                "connections": self._connections,
+                "max_connections": self.max_connections,
+                "topics": len(self._subs),
+                "published": self._published,
+                "dropped_subscribers": self._dropped,
+                "fanout_ms": {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+                              "max": round(self._latency_max * 1000, 3)},
+            }
+
+    # ---- change stream source ----
+    def ensure_source(self):
+        with self._lock:
+            if self.mode is not None:
+                return
+            self.mode = "local"
+        if EVENTS_SOURCE == "local":
+            return
+        try:
+            stream = self._open_stream()
+        except Exception as e:
+            # Standalone mongod (or a test stand-in) has no change streams
+            if EVENTS_SOURCE == "change_stream":
+                print(f"[EVENTS] change stream unavailable, using local pub/sub: {e}")
+            return
+        self.mode = "change_stream"
+        threading.Thread(target=self._run_stream, args=(stream,), daemon=True, name="events-change-stream").start()
+
+    def _open_stream(self, resume_after=None):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": [bookings.name, venues.name]},
+            "operationType": {"$in": ["insert", "update", "replace"]}
+        }}]
+        return db.watch(pipeline, full_document="updateLookup", resume_after=resume_after)
+
+    def _run_stream(self, stream):
+        resume_token = None
+        while True:
+            try:
+                with stream:
+                    for change in stream:
+                        resume_token = change.get("_id")
+                        self._dispatch_change(change)
+            except Exception as e:
+                print(f"[EVENTS] change stream error, falling back to local pub/sub: {e}")
+            self.mode = "local"
+            time.sleep(5)
+            try:
+                stream = self._open_stream(resume_after=resume_token)
+            except Exception:
+                try:
+                    stream = self._open_stream()  # resume token may have rolled off the oplog
+                except Exception:
+                    continue
+            self.mode = "change_stream"
+
+    def _dispatch_change(self, change):
+        doc = change.get("fullDocument")
+        if not doc:
+            return
+        coll = change.get("ns", {}).get("coll")
+        if coll == bookings.name:
+            for topic, event_type, data in booking_events(doc):
+                self.publish(topic, event_type, data)
+        elif coll == venues.name:
+            updated = (change.get("updateDescription") or {}).get("updatedFields") or {}
+            if change["operationType"] == "replace" or "dates_available" in updated:
+                self.publish(*dates_event(doc))
+
+
+event_hub = EventHub(SSE_MAX_CONNECTIONS, SSE_QUEUE_SIZE)
+
+
+def booking_events(bk):
+    """
+    (topic, type, data) triples for a booking change: the booking itself goes
+    to the booker and the venue owner, availability goes to the venue feed.
+    At most one pending/confirmed booking exists per venue and date, so the
+    booking's own status decides availability.
+    """
+    booking = {
+        "id": str(bk["_id"]),
+        "venue_id": str(bk["venue_id"]),
+        "user_id": str(bk["user_id"]),
+        "date": bk.get("date"),
+        "status": bk.get("status"),
+        "price_locked": bk.get("price_locked"),
+    }
+    out = [(f"user:{bk['user_id']}", "booking", booking)]
+    owner_id = bk.get("venue_owner_id")
+    if owner_id:
+        out.append((f"user:{owner_id}", "booking", booking))
+    out.append((f"venue:{bk['venue_id']}", "availability", {
+        "venue_id": str(bk["venue_id"]),
+        "date": bk.get("date"),
+        "available": bk.get("status") not in ["pending", "confirmed"],
+    }))
+    return out
+
+
+def dates_event(venue):
+    return (f"venue:{venue['_id']}", "dates", {
+        "venue_id": str(venue["_id"]),
+        "dates_available": venue.get("dates_available", []),
+    })
+
+
+def publish_booking_change(bk):
+    # mode is None until someone subscribes in this process: nothing to do
+    if event_hub.mode in (None, "change_stream"):
+        return
+    if "venue_owner_id" not in bk:
+        # Booking from before 'venue_owner_id' was stored
+        bk = {**bk, "venue_owner_id": booking_venue_owner_id(bk)}
+    for topic, event_type, data in booking_events(bk):
+        event_hub.publish_local(topic, event_type, data)
+
+
+def publish_dates_change(venue):
+    event_hub.publish_local(*dates_event(venue))
+
+
+def sse_stream(topics):
+    """
+    text/event-stream response for the given topics, or a 503 when the
+    connection limit is reached. Streams end after SSE_MAX_STREAM_SECONDS;
+    EventSource reconnects on its own, which also rebalances workers.
+    """
+    q = event_hub.subscribe(topics)
+    if q is None:
+        resp, status = err("Too many live connections, retry shortly.", 503)
+        resp.headers["Retry-After"] = str(SSE_HEARTBEAT_SECONDS)
+        return resp, status
+
+    def gen():
+        deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        try:
+            yield f"retry: {SSE_HEARTBEAT_SECONDS * 1000}\n\n"
+            while not q.closed and time.monotonic() < deadline:
+                try:
+                    ev = q.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                event_hub.record_delivery(ev)
+                yield f"id: {ev['id']}\nevent: {ev['type']}\ndata: {json.dumps(ev['data'])}\n\n"
+        finally:
+            event_hub.unsubscribe(q, topics)
+
+    resp = Response(stream_with_context(gen()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
     })
+    # The generator never starts for HEAD (or if the client is gone before the
+    # first byte), so its finally can't be the only place the slot is released
+    resp.call_on_close(lambda: event_hub.unsubscribe(q, topics))
+    return resp
+
+
+@app.get("/venues/<venue_id>/events")
+def venue_events(venue_id):
+    """
+    Public availability feed for one venue.
+    Events: 'availability' {venue_id, date, available}, 'dates' {venue_id, dates_available}
+    """
+    try:
+        v_id = ObjectId(venue_id)
+    except Exception:
+        return err("Invalid venue_id.", 400)
+    return sse_stream([f"venue:{v_id}"])
+
+
+@app.post("/events/token")
+@auth_required()
+def events_token():
+    """
+    Short-lived token for /events/me?access_token=..., so the login JWT never
+    goes into a URL. Fetch a new one before each (re)connect.
+    """
+    token = issue_scoped_token(request.user, "events", SSE_TOKEN_TTL_SECONDS)
+    return ok({"token": token, "expires_in": SSE_TOKEN_TTL_SECONDS})
+
+
+@app.get("/events/me")
+@auth_required(owner_only=False, query_token_scope="events")
+def my_events():
+    """
+    Booking status changes for the current user: their own bookings and,
+    for owners, bookings on their venues.
+    Events: 'booking' {id, venue_id, user_id, date, status, price_locked}
+    """
+    return sse_stream([f"user:{request.user['_id']}"])
 
 
 # -------------------- Run --------------------
@@ -0,0 +1,372 @@
+"""
+Async (ASGI) serving mode: `uvicorn asgi:app --workers 2`
+
+The hot read and booking-status routes below run as coroutines on an async
+Mongo client, so a request waiting on Mongo costs a coroutine instead of a
+worker thread, and independent lookups in one request run concurrently.
+Every other route (signup/login hashing, create_booking with idempotency and
+transactions, venue writes/imports, uploads, analytics, SSE, /ready, /metrics)
+is served by the Flask app from app.py, mounted through a WSGI bridge: same
+code, same responses, same config.
+
+Needs the extra packages in requirements-async.txt. The async client is
+PyMongo's native AsyncMongoClient (pymongo >= 4.10): operations run on the
+event loop, with no thread pool behind them.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+import app as core
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError as e:
+    raise ImportError("Async mode needs the packages in requirements-async.txt") from e
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError as e:
+    raise ImportError("Async mode needs pymongo>=4.10 (see requirements.txt)") from e
+
+
+# -------------------- Async Mongo client --------------------
+# Same pool limits and command listeners as the sync client. Its pools are
+# tracked separately (client="async" on /ready and /metrics): each client has
+# its own MONGO_MAX_POOL_SIZE connections per server.
+pool_monitor = core.PoolMonitor("async")
+core.pool_monitors.append(pool_monitor)
+client = AsyncMongoClient(
+    core.MONGO_URI,
+    serverSelectionTimeoutMS=5000,
+    maxPoolSize=core.MONGO_MAX_POOL_SIZE,
+    waitQueueTimeoutMS=core.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    event_listeners=[pool_monitor, *(l for l in core.listeners if l is not core.pool_monitor)],
+)
+db = client["halls_db"]
+users = db["users"]
+venues = db["venues"]
+bookings = db["bookings"]
+venues_read = venues.with_options(read_preference=core.venues_read.read_preference)
+bookings_read = bookings.with_options(read_preference=core.bookings_read.read_preference)
+
+
+# -------------------- Helpers --------------------
+def json_response(payload, status):
+    # Flask's JSON provider, so dates/ObjectIds serialize exactly as on the sync routes
+    return Response(core.app.json.dumps(payload), status_code=status, media_type="application/json")
+
+
+def ok(data=None, status=200):
+    return json_response({"ok": True, **({"data": data} if data is not None else {})}, status)
+
+
+def err(message, status=400):
+    return json_response({"ok": False, "error": message}, status)
+
+
+async def request_json(request):
+    # Mirrors request.get_json(silent=True) or {}
+    if request.headers.get("content-type", "").split(";")[0].strip() != "application/json":
+        return {}
+    try:
+        body = await request.json()
+    except ValueError:
+        return {}
+    return body or {}
+
+
+def bearer_subject(request):
+    """-> (user ObjectId, None) or (None, 401 response). No database access."""
+    user_id, msg = core.token_subject(request.headers.get("authorization", ""))
+    if msg:
+        return None, err(msg, 401)
+    return user_id, None
+
+
+async def load_user(user_id, owner_only=False):
+    """-> (user, None) or (None, error response); the async half of auth_required."""
+    user = await users.find_one({"_id": user_id})
+    if not user:
+        return None, err("User not found.", 401)
+    if owner_only and not bool(user.get("is_venue_owner", False)):
+        return None, err("Owner access required.", 403)
+    return user, None
+
+
+async def authenticate(request, owner_only=False):
+    user_id, denied = bearer_subject(request)
+    if denied:
+        return None, denied
+    return await load_user(user_id, owner_only)
+
+
+def cors_headers(request, response):
+    # Same policy flask-cors applies to the mounted routes (preflights go there too)
+    origin = request.headers.get("origin")
+    if origin in core.CORS_ORIGINS:
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers.add_vary_header("Origin")
+    return response
+
+
+def after_transition(bk, old_status, new_status, bk2):
+    # Rollups and live events use the sync client; run in a worker thread
+    core.record_booking_transition(bk, old_status, new_status)
+    core.publish_booking_change(bk2)
+
+
+routes = []
+
+
+def route(rule, methods):
+    """
+    Register an async handler under the Flask-style rule ("/venues/<venue_id>/...").
+    The rule doubles as the metrics route label, so dashboards don't split by mode.
+    """
+    path = rule.replace("<", "{").replace(">", "}")
+
+    def decorator(fn):
+        async def endpoint(request):
+            started = time.perf_counter()
+            response = await fn(request, **request.path_params)
+            if core.METRICS_ENABLED:
+                method, status = request.method, str(response.status_code)
+                core.HTTP_LATENCY.labels(rule, method).observe(time.perf_counter() - started)
+                core.HTTP_REQUESTS.labels(rule, method, status).inc()
+                if response.status_code >= 400:
+                    core.HTTP_ERRORS.labels(rule, method, status).inc()
+            return cors_headers(request, response)
+        endpoint.__name__ = fn.__name__
+        routes.append(Route(path, endpoint, methods=methods))
+        return fn
+    return decorator
+
+
+# -------------------- Auth --------------------
+@route("/auth/me", ["GET"])
+async def me(request):
+    user, denied = await authenticate(request)
+    if denied:
+        return denied
+    return ok({"profile": core.user_profile_doc(user)})
+
+
+# -------------------- Venues: Search & availability --------------------
+@route("/venues/search", ["GET"])
+async def search_venues(request):
+    q, msg = core.search_query(request.query_params)
+    if msg:
+        return err(msg, 422)
+    rows = await venues_read.find(q).limit(50).to_list(length=None)
+    return ok({"venues": [core.venue_public_doc(v) for v in rows]})
+
+
+@route("/venues/<venue_id>/availability", ["GET"])
+async def venue_availability(request, venue_id):
+    date_str = request.query_params.get("date")
+    if not date_str:
+        return err("Query param 'date' is required as YYYY-MM-DD.", 422)
+    if not ObjectId.is_valid(venue_id):
+        return err("Invalid venue_id.", 400)
+    v_id = ObjectId(venue_id)
+
+    # The booking check only needs the id from the URL: run it alongside the venue read
+    venue, existing = await asyncio.gather(
+        venues_read.find_one({"_id": v_id}),
+        bookings_read.find_one({
+            "venue_id": v_id,
+            "date": date_str,
+            "status": {"$in": ["pending", "confirmed"]}
+        }, {"_id": 1}),
+    )
+    if not venue:
+        return err("Venue not found.", 404)
+    if date_str not in (venue.get("dates_available") or []):
+        return ok({"available": False, "price": None})
+    return ok({"available": existing is None, "price": core.resolve_price_for_date(venue, date_str)})
+
+
+# -------------------- Bookings: reads --------------------
+# Reads filter on the token subject, so they start alongside the user lookup;
+# the result is discarded if the user turns out not to exist.
+@route("/bookings", ["GET"])
+async def list_bookings(request):
+    user_id, denied = bearer_subject(request)
+    if denied:
+        return denied
+    (user, denied), owned = await asyncio.gather(
+        load_user(user_id),
+        venues.find({"owner_id": user_id}, {"_id": 1}).to_list(length=None),
+    )
+    if denied:
+        return denied
+
+    if bool(user.get("is_venue_owner", False)):
+        owner_venue_ids = [v["_id"] for v in owned]
+        if not owner_venue_ids:
+            return ok({"bookings": []})
+        query = {"venue_id": {"$in": owner_venue_ids}}
+    else:
+        query = {"user_id": user_id}
+
+    rows = await bookings.find(query).sort("date", 1).limit(200).to_list(length=None)
+    return ok({"bookings": [core.booking_list_doc(b) for b in rows]})
+
+
+@route("/bookings/my-requests", ["GET"])
+async def my_bookings(request):
+    user_id, denied = bearer_subject(request)
+    if denied:
+        return denied
+    (_, denied), rows = await asyncio.gather(
+        load_user(user_id),
+        bookings.find({"user_id": user_id}).sort("created_at", ASCENDING).to_list(length=None),
+    )
+    if denied:
+        return denied
+    return ok({"bookings": [core.booking_request_doc(bk, with_user=False) for bk in rows]})
+
+
+@route("/bookings/for-my-venues", ["GET"])
+async def bookings_for_owner(request):
+    user_id, denied = bearer_subject(request)
+    if denied:
+        return denied
+    (_, denied), owned = await asyncio.gather(
+        load_user(user_id, owner_only=True),
+        venues.find({"owner_id": user_id}, {"_id": 1}).to_list(length=None),
+    )
+    if denied:
+        return denied
+    q = {"venue_id": {"$in": [v["_id"] for v in owned]}}
+    status = request.query_params.get("status")
+    if status:
+        q["status"] = status
+    rows = await bookings.find(q).sort("date", ASCENDING).to_list(length=None)
+    return ok({"bookings": [core.booking_request_doc(bk) for bk in rows]})
+
+
+# -------------------- Bookings: status changes --------------------
+# Writes wait for the user lookup: nothing is modified on behalf of a deleted account.
+async def booking_venue_owner_id(bk):
+    if "venue_owner_id" in bk:
+        return bk["venue_owner_id"]
+    v = await venues.find_one({"_id": bk["venue_id"]}, {"owner_id": 1})
+    return v["owner_id"] if v else None
+
+
+@route("/bookings/<booking_id>", ["DELETE"])
+async def cancel_booking(request, booking_id):
+    user, denied = await authenticate(request)
+    if denied:
+        return denied
+    if not ObjectId.is_valid(booking_id):
+        return err("Invalid booking_id.", 400)
+    b_id = ObjectId(booking_id)
+
+    user_id = user["_id"]
+    now = datetime.utcnow()
+    change = {"$set": {"status": "cancelled", "updated_at": now}}
+    b = await bookings.find_one_and_update(
+        {
+            "_id": b_id,
+            "status": {"$ne": "cancelled"},
+            "$or": [{"user_id": user_id}, {"venue_owner_id": user_id}]
+        },
+        change,
+        return_document=ReturnDocument.BEFORE
+    )
+    if b:
+        await asyncio.to_thread(after_transition, b, b.get("status"), "cancelled",
+                                {**b, "status": "cancelled", "updated_at": now})
+        return ok({"cancelled": True})
+
+    # Slow path: work out why the filter did not match
+    b = await bookings.find_one({"_id": b_id})
+    if not b:
+        return err("Booking not found.", 404)
+    is_booker = b["user_id"] == user_id
+    is_owner = await booking_venue_owner_id(b) == user_id
+    if not (is_booker or is_owner):
+        return err("Not allowed to cancel this booking.", 403)
+    if b.get("status") == "cancelled":
+        return ok({"cancelled": True})
+
+    # Owner of a booking created before 'venue_owner_id' was stored
+    res = await bookings.update_one({"_id": b["_id"], "status": {"$ne": "cancelled"}}, change)
+    if res.modified_count:
+        await asyncio.to_thread(after_transition, b, b.get("status"), "cancelled",
+                                {**b, "status": "cancelled", "updated_at": now})
+    return ok({"cancelled": True})
+
+
+@route("/bookings/<booking_id>", ["PATCH"])
+async def update_booking(request, booking_id):
+    user, denied = await authenticate(request)
+    if denied:
+        return denied
+    b = await request_json(request)
+    new_status = b.get("status")
+    if new_status not in ["confirmed", "rejected", "cancelled"]:
+        return err("Status must be one of: confirmed, rejected, cancelled.", 422)
+    if not ObjectId.is_valid(booking_id):
+        return err("Invalid booking_id.", 422)
+    b_id = ObjectId(booking_id)
+
+    user_id = user["_id"]
+    if new_status in ["confirmed", "rejected"]:
+        q = {"_id": b_id, "venue_owner_id": user_id, "status": "pending"}
+    else:
+        q = {"_id": b_id, "user_id": user_id}
+    update = {"$set": {"status": new_status, "updated_at": datetime.utcnow()}}
+
+    bk = await bookings.find_one_and_update(q, update, return_document=ReturnDocument.BEFORE)
+    if not bk:
+        # Slow path: report why the filter did not match
+        bk = await bookings.find_one({"_id": b_id})
+        if not bk:
+            return err("Booking not found.", 404)
+        if new_status in ["confirmed", "rejected"]:
+            if await booking_venue_owner_id(bk) != user_id:
+                return err("Only the venue owner can confirm/reject.", 403)
+            if bk["status"] != "pending":
+                return err("Only pending bookings can be confirmed/rejected.", 409)
+            # Owner of a booking created before 'venue_owner_id' was stored
+            bk = await bookings.find_one_and_update(
+                {"_id": b_id, "status": "pending"}, update, return_document=ReturnDocument.BEFORE
+            )
+            if not bk:
+                return err("Only pending bookings can be confirmed/rejected.", 409)
+        else:
+            return err("Only the booking user can cancel.", 403)
+
+    bk2 = {**bk, **update["$set"]}
+    await asyncio.to_thread(after_transition, bk, bk.get("status"), new_status, bk2)
+    return ok({"booking": core.booking_status_doc(bk2)})
+
+
+# -------------------- App --------------------
+@asynccontextmanager
+async def lifespan(_app):
+    print(f"[ASGI] {len(routes)} routes on the async client, "
+          f"rest via WSGI on {core.WEB_THREADS} threads (SSE cap {core.SSE_MAX_CONNECTIONS})")
+    yield
+    await client.close()
+
+
+# Async routes first; anything they don't fully match (other paths, other
+# methods such as POST /bookings or CORS preflights) falls through to Flask.
+# The bridge runs Flask on WEB_THREADS threads, the same budget a gthread
+# worker has, so the SSE cap derived from it leaves the same headroom.
+app = Starlette(
+    routes=[*routes, Mount("/", app=WSGIMiddleware(core.app, workers=core.WEB_THREADS))],
+    lifespan=lifespan,
+)
@@ -0,0 +1,465 @@
+"""
+Reproducible load test for the hot API paths.
+
+    # seed a throwaway Mongo (MONGO_URI; wipes users/venues/bookings in halls_db)
+    # and benchmark the app in-process
+    python bench/api_bench.py seed --wipe
+    python bench/api_bench.py run --out results/build-a.json
+
+    # no Mongo at hand: seed + run against an in-process stand-in (mongomock)
+    python bench/api_bench.py run --standin --venues 500 --bookings 20000
+
+    # against a running server (same JWT_SECRET/MONGO_URI as the server)
+    python bench/api_bench.py run --url http://localhost:5000
+
+    # compare two builds
+    python bench/api_bench.py compare results/build-a.json results/build-b.json
+
+Data is generated from --seed, so two runs with the same flags hit the same
+venues, dates and users. Results are JSON: per endpoint p50/p95/p99 latency,
+throughput, status codes and Mongo commands per request.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from pymongo import monitoring, uri_parser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VENUE_TYPES = ["Hall", "Auditorium", "Banquet", "Lawn"]
+AMENITIES = ["parking_valet", "entry_package", "water", "air_conditioner", "partition_facility", "sound_system"]
+ENDPOINTS = ["search_venues", "venue_availability", "create_booking", "list_bookings"]
+
+op_counter = threading.local()  # Mongo commands issued by the current thread
+
+
+class OpCounter(monitoring.CommandListener):
+    def started(self, event):
+        op_counter.n = getattr(op_counter, "n", 0) + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def count_standin_ops():
+    # mongomock emits no command events; count collection calls instead
+    import mongomock
+
+    def wrap(fn):
+        def counted(*a, **kw):
+            # mongomock methods call each other (find_one -> find); count the outer call only
+            if getattr(op_counter, "depth", 0):
+                return fn(*a, **kw)
+            op_counter.n = getattr(op_counter, "n", 0) + 1
+            op_counter.depth = 1
+            try:
+                return fn(*a, **kw)
+            finally:
+                op_counter.depth = 0
+        return counted
+
+    for name in ["find_one", "find", "insert_one", "insert_many", "update_one", "update_many", "delete_one",
+                 "delete_many", "find_one_and_update", "find_one_and_delete", "aggregate", "count_documents",
+                 "bulk_write", "replace_one"]:
+        setattr(mongomock.collection.Collection, name, wrap(getattr(mongomock.collection.Collection, name)))
+
+
+def load_app(standin):
+    """Import app.py, optionally on top of mongomock, with Mongo command counting."""
+    if standin:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("--standin needs mongomock: pip install -r bench/requirements.txt")
+        import pymongo
+        real = pymongo.MongoClient
+        pymongo.MongoClient = mongomock.MongoClient
+        try:
+            import app
+        finally:
+            pymongo.MongoClient = real
+        count_standin_ops()
+    else:
+        monitoring.register(OpCounter())  # must precede client creation in app.py
+        import app
+    return app
+
+
+# -------------------- Seed --------------------
+def calendar(start, days):
+    return [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+BENCH_EMAIL_DOMAIN = "@bench.local"
+
+
+def check_seed_target(app, wipe):
+    """
+    The seed wipes users/venues/bookings/booking_rollups in 'halls_db' (app.py's
+    database, whatever MONGO_URI names), which is also the production name. Only
+    proceed with an explicit --wipe, and never over accounts this script didn't create.
+    """
+    named = uri_parser.parse_uri(app.MONGO_URI).get("database")
+    if named and named != app.db.name:
+        sys.exit(f"MONGO_URI names database '{named}', but the app (and this seed) use "
+                 f"'{app.db.name}'. Seeding would wipe users/venues/bookings there; point "
+                 f"MONGO_URI at a throwaway server with .../{app.db.name} instead.")
+    foreign = app.users.find_one({"email": {"$not": re.compile(re.escape(BENCH_EMAIL_DOMAIN) + "$")}}, {"email": 1})
+    if foreign:
+        sys.exit(f"Refusing to seed: '{app.db.name}' at MONGO_URI has non-bench users "
+                 f"(e.g. {foreign.get('email')!r}). Use a throwaway MongoDB.")
+    if not wipe:
+        sys.exit(f"Seeding deletes users/venues/bookings/booking_rollups in '{app.db.name}'. "
+                 f"Re-run with --wipe to confirm.")
+
+
+def seed(app, args):
+    rng = random.Random(args.seed)
+    t0 = time.perf_counter()
+    for coll in (app.users, app.venues, app.bookings, app.booking_rollups):
+        coll.delete_many({})
+
+    pw_hash = app.generate_password_hash("bench-password")
+    now = datetime.utcnow()
+    owners = [{"email": f"owner{i}{BENCH_EMAIL_DOMAIN}", "full_name": f"Owner {i}", "password_hash": pw_hash,
+               "is_venue_owner": True, "role": "owner", "auth_provider": "password",
+               "created_at": now, "updated_at": now} for i in range(args.owners)]
+    users = [{"email": f"user{i}{BENCH_EMAIL_DOMAIN}", "full_name": f"User {i}", "password_hash": pw_hash,
+              "is_venue_owner": False, "role": "user", "auth_provider": "password",
+              "created_at": now, "updated_at": now} for i in range(args.users)]
+    app.users.insert_many(owners + users, ordered=False)
+
+    start = date.fromisoformat(args.start_date)
+    days = calendar(start, args.calendar_days)
+    venues = []
+    for i in range(args.venues):
+        owner = owners[i % len(owners)]
+        base = rng.choice([50000, 80000, 120000, 200000])
+        open_days = [d for d in days if rng.random() < 0.85]
+        venues.append({
+            "owner_id": owner["_id"],
+            "venue_name": f"Venue {i}",
+            "type": rng.choice(VENUE_TYPES),
+            "address": f"{i} Bench Street",
+            "maps_location": {"type": "Point", "coordinates": [74.0 + rng.random(), 31.0 + rng.random()]},
+            "capacity": rng.choice([100, 200, 300, 500, 800, 1200]),
+            "dates_available": open_days,
+            "pricing": {"overrides": [{"date": d, "price": float(base * rng.choice([1, 1, 1.2, 1.5]))} for d in open_days]},
+            "space_sqft": float(rng.randint(2000, 30000)),
+            "amenities": {a: rng.random() < 0.5 for a in AMENITIES},
+            "additional_description": "",
+            "pictures": [],
+            "videos": [],
+            "created_at": now,
+            "updated_at": now,
+        })
+    for v in venues:
+        v["amenity_mask"] = app.amenity_mask(v["amenities"])
+    for chunk in chunks(venues, 1000):
+        app.venues.insert_many(chunk, ordered=False)
+
+    # At most one pending/confirmed booking per venue and date, like the app enforces
+    taken = set()
+    batch, n = [], 0
+    statuses = ["pending"] * 3 + ["confirmed"] * 4 + ["rejected"] * 2 + ["cancelled"]
+    while n < args.bookings:
+        v = venues[rng.randrange(len(venues))]
+        if not v["dates_available"]:
+            continue
+        d = rng.choice(v["dates_available"])
+        st = rng.choice(statuses)
+        if st in ("pending", "confirmed"):
+            if (v["_id"], d) in taken:
+                st = "rejected"
+            else:
+                taken.add((v["_id"], d))
+        price = next((o["price"] for o in v["pricing"]["overrides"] if o["date"] == d), None)
+        batch.append({"venue_id": v["_id"], "venue_owner_id": v["owner_id"], "user_id": users[rng.randrange(len(users))]["_id"],
+                      "date": d, "guests": rng.randint(20, v["capacity"]), "price_locked": price, "status": st,
+                      "notes": "", "created_at": now, "updated_at": now})
+        n += 1
+        if len(batch) >= 5000:
+            app.bookings.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        app.bookings.insert_many(batch, ordered=False)
+
+    stats = {"owners": len(owners), "users": len(users), "venues": len(venues), "bookings": n,
+             "calendar_days": args.calendar_days, "seconds": round(time.perf_counter() - t0, 2)}
+    print(f"[BENCH] seeded {stats}", file=sys.stderr)
+    return stats
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# -------------------- Workload --------------------
+def build_requests(app, args):
+    """Deterministic request list per endpoint: (method, path, json_body, token)."""
+    rng = random.Random(args.seed + 1)
+    venues = list(app.venues.find({}, {"_id": 1, "dates_available": 1, "type": 1}))
+    users = list(app.users.find({"is_venue_owner": False}, {"_id": 1, "email": 1, "is_venue_owner": 1}).limit(500))
+    owners = list(app.users.find({"is_venue_owner": True}, {"_id": 1, "email": 1, "is_venue_owner": 1}).limit(100))
+    if not venues or not users:
+        sys.exit("No seed data found; run 'seed' first (or pass --standin).")
+    tokens = {u["_id"]: app.issue_token(u) for u in users + owners}
+    days = calendar(date.fromisoformat(args.start_date), args.calendar_days)
+
+    def pick_date(v):
+        return rng.choice(v["dates_available"]) if v.get("dates_available") else rng.choice(days)
+
+    reqs = {e: [] for e in ENDPOINTS}
+    for _ in range(args.requests):
+        q = [f"type={rng.choice(VENUE_TYPES)}"]
+        if rng.random() < 0.6:
+            q.append(f"capacity_min={rng.choice([100, 200, 300, 500])}")
+        if rng.random() < 0.5:
+            q.append(f"date={rng.choice(days)}")
+        if rng.random() < 0.3:
+            q.append("amenities=" + ",".join(rng.sample(AMENITIES, rng.randint(1, 2))))
+        reqs["search_venues"].append(("GET", "/venues/search?" + "&".join(q), None, None))
+
+        v = rng.choice(venues)
+        reqs["venue_availability"].append(("GET", f"/venues/{v['_id']}/availability?date={pick_date(v)}", None, None))
+
+        v = rng.choice(venues)
+        u = rng.choice(users)
+        body = {"venue_id": str(v["_id"]), "date": pick_date(v), "guests": rng.randint(20, 300)}
+        reqs["create_booking"].append(("POST", "/bookings", body, tokens[u["_id"]]))
+
+        who = rng.choice(owners) if owners and rng.random() < 0.2 else rng.choice(users)
+        reqs["list_bookings"].append(("GET", "/bookings", None, tokens[who["_id"]]))
+    return reqs
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.app.test_client()
+
+    def call(self, method, path, body, token):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        op_counter.n = 0
+        r = self.client.open(path, method=method, json=body, headers=headers)
+        return r.status_code, op_counter.n
+
+
+class HttpClient:
+    """Mongo ops come from the server's Server-Timing header (QUERY_TRACE_ENABLED=true)."""
+
+    def __init__(self, base):
+        self.base = base.rstrip("/")
+
+    def call(self, method, path, body, token):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base + path, data=data, method=method)
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        if token:
+            req.add_header("Authorization", f"Bearer {token}")
+        try:
+            with urllib.request.urlopen(req, timeout=30) as r:
+                r.read()
+                return r.status, ops_from_server_timing(r.headers.get("Server-Timing"))
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, ops_from_server_timing(e.headers.get("Server-Timing"))
+
+
+def ops_from_server_timing(header):
+    for part in (header or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        if fields[0] == "db":
+            for f in fields[1:]:
+                if f.startswith("desc="):
+                    return int(f[5:].strip('"').split()[0])
+    return None
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(p * (len(sorted_vals) - 1))))]
+
+
+def run_endpoint(make_client, requests, concurrency, warmup):
+    lat, ops, codes = [], [], {}
+    lock = threading.Lock()
+    idx = itertools.count()
+
+    def worker():
+        client = make_client()
+        while True:
+            i = next(idx)
+            if i >= len(requests):
+                return
+            t0 = time.perf_counter()
+            status, n_ops = client.call(*requests[i])
+            ms = (time.perf_counter() - t0) * 1000
+            if i < warmup:
+                continue
+            with lock:
+                lat.append(ms)
+                codes[str(status)] = codes.get(str(status), 0) + 1
+                if n_ops is not None:
+                    ops.append(n_ops)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for f in [pool.submit(worker) for _ in range(concurrency)]:
+            f.result()
+    elapsed = time.perf_counter() - t0
+
+    lat.sort()
+    ops.sort()
+    errors = sum(n for code, n in codes.items() if int(code) >= 500)
+    return {
+        "requests": len(lat),
+        "errors_5xx": errors,
+        "status_counts": codes,
+        "throughput_rps": round(len(lat) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": r3(percentile(lat, 0.50)), "p95": r3(percentile(lat, 0.95)), "p99": r3(percentile(lat, 0.99)),
+            "mean": r3(sum(lat) / len(lat)) if lat else None, "max": r3(lat[-1]) if lat else None,
+        },
+        "mongo_ops_per_request": {
+            "mean": r3(sum(ops) / len(ops)) if ops else None, "p95": percentile(ops, 0.95), "max": ops[-1] if ops else None,
+        },
+    }
+
+
+def r3(x):
+    return round(x, 3) if x is not None else None
+
+
+def git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    app = load_app(args.standin)
+    seeded = seed(app, args) if args.standin else None
+    reqs = build_requests(app, args)
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        make_client = lambda: InProcessClient(app)
+
+    result = {
+        "meta": {
+            "git": git_rev(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "target": args.url or ("in-process/standin" if args.standin else "in-process/mongo"),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "seeded": seeded,
+        },
+        "endpoints": {},
+    }
+    only = args.endpoints.split(",") if args.endpoints else ENDPOINTS
+    for name in only:
+        print(f"[BENCH] {name} ...", file=sys.stderr)
+        result["endpoints"][name] = run_endpoint(make_client, reqs[name], args.concurrency, args.warmup)
+
+    out = json.dumps(result, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+    print(out)
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    print(f"{'endpoint':<20} {'metric':<16} {'base':>10} {'head':>10} {'change':>8}")
+    for name, h in head["endpoints"].items():
+        b = base["endpoints"].get(name)
+        if not b:
+            continue
+        rows = [("p50_ms", b["latency_ms"]["p50"], h["latency_ms"]["p50"]),
+                ("p95_ms", b["latency_ms"]["p95"], h["latency_ms"]["p95"]),
+                ("p99_ms", b["latency_ms"]["p99"], h["latency_ms"]["p99"]),
+                ("rps", b["throughput_rps"], h["throughput_rps"]),
+                ("mongo_ops_mean", b["mongo_ops_per_request"]["mean"], h["mongo_ops_per_request"]["mean"])]
+        for metric, bv, hv in rows:
+            change = f"{(hv - bv) / bv * 100:+.1f}%" if bv and hv is not None else "-"
+            print(f"{name:<20} {metric:<16} {fmt(bv):>10} {fmt(hv):>10} {change:>8}")
+
+
+def fmt(v):
+    return "-" if v is None else f"{v:.2f}" if isinstance(v, float) else str(v)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    def data_args(sp):
+        sp.add_argument("--seed", type=int, default=42)
+        sp.add_argument("--venues", type=int, default=3000)
+        sp.add_argument("--owners", type=int, default=300)
+        sp.add_argument("--users", type=int, default=5000)
+        sp.add_argument("--bookings", type=int, default=300000)
+        sp.add_argument("--calendar-days", type=int, default=365)
+        sp.add_argument("--start-date", default="2026-01-01")
+
+    sp = sub.add_parser("seed", help="(re)seed the database at MONGO_URI")
+    data_args(sp)
+    sp.add_argument("--wipe", action="store_true", help="confirm deleting existing users/venues/bookings")
+    sp.add_argument("--standin", action="store_true", help=argparse.SUPPRESS)
+
+    sp = sub.add_parser("run", help="run the benchmark and print JSON results")
+    data_args(sp)
+    sp.add_argument("--standin", action="store_true", help="seed and run against in-process mongomock")
+    sp.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    sp.add_argument("--concurrency", type=int, default=16)
+    sp.add_argument("--requests", type=int, default=2000, help="requests per endpoint")
+    sp.add_argument("--warmup", type=int, default=50, help="leading requests excluded from results")
+    sp.add_argument("--endpoints", help=f"comma-separated subset of {','.join(ENDPOINTS)}")
+    sp.add_argument("--out", help="also write results to this file")
+
+    sp = sub.add_parser("compare", help="compare two result files")
+    sp.add_argument("base")
+    sp.add_argument("head")
+
+    args = p.parse_args()
+    if args.cmd == "seed":
+        app = load_app(args.standin)
+        if not args.standin:
+            check_seed_target(app, args.wipe)
+        seed(app, args)
+    elif args.cmd == "run":
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()